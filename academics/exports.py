@@ -0,0 +1,62 @@
+from academics import models
+from academics.views import AssessmentViewSet, SectionViewSet
+from attendance.models import StudentAttendanceItem
+from attendance.views import DailyStudentAttendanceViewSet
+from common.exports import get_file_name
+
+
+def get_section_students_export(section_id, **params):
+    queryset = SectionViewSet.get_students_queryset(section_id)
+    return get_file_name('section_students'), [
+        'GR Number', 'Full Name', 'Average Attendance'
+    ], queryset, SectionViewSet.get_csv_row
+
+
+def get_assessment_export(assessment_id, **params):
+    instance = models.Assessment.objects.filter(id=assessment_id).select_related(
+        'section_subject__section__grade'
+    ).first()
+    date = instance.date.strftime('%Y_%m_%d')
+    grade = instance.section_subject.section.grade
+    section = instance.section_subject.section.name
+    name = instance.name.replace(" ", "_")
+    file_name = f'{grade}_{section}_{name}_{date}.csv'
+    items = instance.items.all().select_related('student__profile__student_info')
+    return file_name, [
+        'GR Number', 'Full Name', 'Obtained Marks', 'Comments'
+    ], items, AssessmentViewSet.get_csv_row
+
+
+def get_section_attendance_export(**params):
+    """
+    Attendance of a section with a column for each date and a row for each student.
+    Dates are read upfront for the header, rows are built in memory once items are
+    iterated since every date of a student has to be known before its row is written.
+    """
+    queryset = DailyStudentAttendanceViewSet.get_filtered_queryset(params).order_by('date')
+    date_format = '%d/%m/%Y'
+    dates = [date.strftime(date_format) for date in queryset.values_list('date', flat=True)]
+
+    def get_students():
+        students = {}
+        for attendance in queryset.prefetch_related('items__student__profile__student_info'):
+            formatted_date = attendance.date.strftime(date_format)
+            for item in attendance.items.all():
+                student_name = f'{item.student.profile.fullname} ({item.student.profile.student_info.gr_number})'
+                if student_name not in students:
+                    students[student_name] = {}
+                    students[student_name]['total_presents'] = 0
+                attendance_status = ''
+                if item.status == StudentAttendanceItem.PRESENT:
+                    attendance_status = 'P'
+                    students[student_name]['total_presents'] = students[student_name]['total_presents'] + 1
+                elif item.status == StudentAttendanceItem.ABSENT:
+                    attendance_status = 'A'
+                elif item.status == StudentAttendanceItem.LEAVE:
+                    attendance_status = 'L'
+                students[student_name][formatted_date] = attendance_status
+        yield from students.items()
+
+    return get_file_name('attendance'), ['Student'] + ['Average %'] + dates, \
+        get_students(), \
+        lambda student: SectionViewSet.get_attendance_row(student[0], student[1], dates)
@@ -0,0 +1,46 @@
+import io
+import zipfile
+
+from academics.services.results import ResultCardService
+from common import artifacts
+from common.jobs import report_progress
+
+PROGRESS_INTERVAL = 25
+
+
+def generate_result_cards(job, target_type, target_id):
+    """
+    Builds result cards of all students in a section, grade or session in a single pass
+    and writes them to a zip archive with one CSV file per student.
+    
+    Parameters:
+        job (Model): Job running this function
+        target_type (str): One of section, grade or session
+        target_id (int): Id of the section, grade or session
+    
+    Returns:
+        str: Name of the generated archive in the artifact store
+    """
+    if target_type == 'section':
+        cards = ResultCardService.get_section_result_cards(target_id)
+    elif target_type == 'grade':
+        cards = ResultCardService.get_grade_result_cards(target_id)
+    else:
+        cards = ResultCardService.get_session_result_cards(target_id)
+    cards = [card for card in cards.values() if card['subjects']]
+    report_progress(job, 0, len(cards))
+
+    name = f'result_cards_{target_type}_{target_id}.zip'
+    file_name = artifacts.new_file_name(name)
+    path = artifacts.get_path(file_name)
+    with zipfile.ZipFile(path, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for index, card in enumerate(cards, 1):
+            file = io.StringIO()
+            ResultCardService.write_result_card(file, card)
+            fullname = card['fullname'].lower().replace(' ', '_')
+            archive.writestr(f'result_card_{fullname}_{card["student_id"]}.csv', file.getvalue())
+            if index % PROGRESS_INTERVAL == 0:
+                report_progress(job, index)
+    artifacts.save_artifact(name, file_name)
+    return file_name
+
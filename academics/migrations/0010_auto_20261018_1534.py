@@ -0,0 +1,17 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0009_auto_20191029_1324'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(condition=models.Q(('exam', None), ('is_active', True)), fields=['section_subject', 'date'], name='academics_as_active_date'),
+        ),
+    ]
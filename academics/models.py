@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 
 from accounts.models import User
 from common.models import BaseModel, Session
@@ -54,6 +55,13 @@ class Assessment(BaseModel):
     )
     consolidated = models.BooleanField(default=False)
 
+    class Meta:
+        # Standalone assessments are listed per section subject by date
+        indexes = [
+            models.Index(fields=['section_subject', 'date'], condition=Q(is_active=True, exam=None),
+                         name='academics_as_active_date'),
+        ]
+
 
 class StudentAssessment(BaseModel):
     assessment = models.ForeignKey(
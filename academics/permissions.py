@@ -2,6 +2,7 @@ from django.db.models import Q
 from rest_framework.permissions import BasePermission
 
 from accounts.models import Profile
+from common.permissions import has_role
 
 
 class ViewSubjectsPermission(BasePermission):
@@ -15,4 +16,4 @@ class ChangeSubjectsPermission(BasePermission):
         if not user.is_authenticated:
             return False
         # return user.groups.filter(Q(name='Admin') | Q(name='Teacher')).count() > 0
-        return user.groups.filter(Q(name='Admin')).count() > 0
+        return has_role(user, 'Admin')
@@ -121,4 +121,9 @@ class StudentAssessmentSerializer(serializers.ModelSerializer):
         model = models.StudentAssessment
         fields = ('id', 'student', 'student_id', 'assessment', 'obtained_marks',
                   'comments',
-                  )
\ No newline at end of file
+                  )
+
+
+class ResultCardsJobSerializer(serializers.Serializer):
+    target_type = serializers.ChoiceField(choices=['section', 'grade', 'session'])
+    target_id = serializers.IntegerField()
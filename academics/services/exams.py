@@ -1,6 +1,8 @@
 from academics import models
+from common.references import get_current_session
 from datetime import date
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
 
 
 class ExamService:
@@ -22,7 +24,7 @@ class ExamService:
         Returns:
             Model: An instance of created exam
         """
-        current_session = models.Session.objects.filter(is_active=True).first()
+        current_session = get_current_session()
         exam = models.Exam.objects.create(
             name=name, section_id=section['id'],
             consolidated=False, date=exam_date,
@@ -57,64 +59,80 @@ class ExamService:
         return exam
 
     @staticmethod
-    def create_consolidated_exam(name, section, exam_ids):
+    def create_consolidated_exam(name, section, exam_ids, weights=None):
         """
         Creates a consolidated exam and their corresponding assessments for students in the given section.
         The final result of students for each section subject is compiled from provided exams with provided exam ids.
+        Marks of all students are summed with a single grouped query and written with bulk inserts.
         
         Parameters:
             name (str): Name of the exam
             section (Model): Section for which to create the exam
             exam_ids ([int]): An array of integers containing ids of selected exams
+            weights (dict): Optional weight against each exam id, exams without a weight have a weight of 1
         
         Returns:
             Model: An instance of created exam
         """
-        exam = models.Exam.objects.create(
-            name=name, section_id=section['id'], consolidated=True, date=date.today()
+        weights = {int(key): float(value) for key, value in (weights or {}).items()}
+        weight = Case(
+            *[When(exam_id=key, then=Value(value)) for key, value in weights.items()],
+            default=Value(1.0), output_field=FloatField()
+        )
+        item_weight = Case(
+            *[When(assessment__exam_id=key, then=Value(value)) for key, value in weights.items()],
+            default=Value(1.0), output_field=FloatField()
         )
-        current_session = models.Session.objects.filter(is_active=True).first()
 
-        """
-        Fetch all assessments in provided exam ids and map each assessment against
-        its section subject id
-        """
-        section_subjects = {}
-        assessments = models.Assessment.objects.filter(exam_id__in=exam_ids)
-        for assessment in assessments.all():
-            if assessment.section_subject.id not in section_subjects:
-                section_subjects[assessment.section_subject.id] = []
-            section_subjects[assessment.section_subject.id].append(assessment)
+        with transaction.atomic():
+            current_session = get_current_session()
+            exam = models.Exam.objects.create(
+                name=name, section_id=section['id'], consolidated=True, date=date.today(),
+                session=current_session
+            )
 
-        # Fetch students in provided section
-        students = models.User.objects.filter(
-            is_active=True, profile__student_info__section_id=section['id']
-        ).values_list('id', flat=True)
-        student_ids = [id for id in students]
-        
-        # Create consolidated assessments for each section subject
-        for key, assessments in section_subjects.items():
-            total_marks = 0
-            for assessment in assessments:
-                total_marks += assessment.total_marks
-            
-            assessment = models.Assessment(
-                name=name, total_marks=total_marks, exam=exam, consolidated=True,
-                section_subject_id=key, date=date.today(), session=current_session
+            # Total marks of each section subject across provided exams
+            section_subjects = models.Assessment.objects.filter(
+                exam_id__in=exam_ids
+            ).values('section_subject_id').annotate(
+                total=Sum(F('total_marks') * weight)
+            ).order_by()
+            section_subjects = {s['section_subject_id']: s['total'] for s in section_subjects}
+
+            # Obtained marks of each student in each section subject across provided exams
+            obtained_marks = models.StudentAssessment.objects.filter(
+                assessment__exam_id__in=exam_ids
+            ).values('student_id', 'assessment__section_subject_id').annotate(
+                obtained=Sum(F('obtained_marks') * item_weight)
+            ).order_by()
+            obtained_marks = {
+                (o['student_id'], o['assessment__section_subject_id']): o['obtained']
+                for o in obtained_marks
+            }
+
+            # Create consolidated assessments for each section subject
+            models.Assessment.objects.bulk_create([
+                models.Assessment(
+                    name=name, total_marks=total_marks, exam=exam, consolidated=True,
+                    section_subject_id=key, date=exam.date, session=current_session
+                ) for key, total_marks in section_subjects.items()
+            ])
+            assessments = models.Assessment.objects.filter(exam=exam).values_list(
+                'id', 'section_subject_id'
             )
-            assessment.save()
+
+            # Fetch students in provided section
+            student_ids = models.User.objects.filter(
+                is_active=True, profile__student_info__section_id=section['id']
+            ).values_list('id', flat=True)
+            student_ids = [id for id in student_ids]
 
             student_assessments = []
-            for id in student_ids:
-                student_assessment = models.StudentAssessment(
-                    assessment=assessment, student_id=id
-                )
-                obtained_marks = models.StudentAssessment.objects.filter(
-                    student_id=id, assessment_id__in=[
-                        a.id for a in assessments
-                    ]
-                ).aggregate(obtained=Sum('obtained_marks'))
-                student_assessment.obtained_marks = obtained_marks['obtained']
-                student_assessments.append(student_assessment)
+            for assessment_id, section_subject_id in assessments:
+                for id in student_ids:
+                    student_assessments.append(models.StudentAssessment(
+                        assessment_id=assessment_id, student_id=id,
+                        obtained_marks=obtained_marks.get((id, section_subject_id), None)
+                    ))
             models.StudentAssessment.objects.bulk_create(student_assessments)
         return exam
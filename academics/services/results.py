@@ -0,0 +1,160 @@
+import csv
+
+from academics import models
+
+
+class ResultCardService:
+    '''
+    Service for building result cards of students.
+    Marks of all students are fetched in a single query and pivoted in memory into
+    a subject x exam matrix, so building cards costs a fixed number of queries.
+    '''
+
+    @staticmethod
+    def get_student_result_card(student_id):
+        """
+        Builds the result card of a single student.
+        
+        Parameters:
+            student_id (int): Id of the student
+        
+        Returns:
+            dict: Result card of the student, None if student does not exist
+        """
+        students = models.User.objects.filter(id=student_id)
+        cards = ResultCardService.build_result_cards(students)
+        return cards.get(int(student_id), None)
+
+    @staticmethod
+    def get_section_result_cards(section_id):
+        """
+        Builds result cards of all active students in the given section.
+        
+        Returns:
+            dict: Result card against each student id
+        """
+        students = models.User.objects.filter(
+            is_active=True, profile__student_info__section_id=section_id
+        )
+        return ResultCardService.build_result_cards(students)
+
+    @staticmethod
+    def get_grade_result_cards(grade_id):
+        """
+        Builds result cards of all active students in the given grade.
+        
+        Returns:
+            dict: Result card against each student id
+        """
+        students = models.User.objects.filter(
+            is_active=True, profile__student_info__section__grade_id=grade_id
+        )
+        return ResultCardService.build_result_cards(students)
+
+    @staticmethod
+    def get_session_result_cards(session_id):
+        """
+        Builds result cards of all active students from exams of the given session.
+        
+        Returns:
+            dict: Result card against each student id
+        """
+        students = models.User.objects.filter(
+            is_active=True, profile__student_info__isnull=False
+        )
+        return ResultCardService.build_result_cards(students, session_id=session_id)
+
+    @staticmethod
+    def build_result_cards(students, session_id=None):
+        """
+        Builds result cards of given students with two queries.
+        
+        Parameters:
+            students (QuerySet): Users for which to build result cards
+            session_id (int): Optionally restrict results to exams of the given session
+        
+        Returns:
+            dict: Result card against each student id. Each card contains student id,
+            fullname, exams ([dict] with name and consolidated flag, ordered by creation),
+            subjects ([str] ordered by name) and results (dict of subject -> exam name -> marks)
+        """
+        cards = {}
+        for student in students.values('id', 'profile__fullname'):
+            cards[student['id']] = {
+                'student_id': student['id'],
+                'fullname': student['profile__fullname'] or '',
+                'exams': [],
+                'subjects': [],
+                'results': {},
+            }
+
+        items = models.StudentAssessment.objects.filter(
+            student_id__in=students.values('id'), assessment__exam__isnull=False,
+        ).values(
+            'student_id', 'obtained_marks', 'assessment__total_marks',
+            'assessment__exam__name', 'assessment__exam__consolidated',
+            'assessment__section_subject__subject__name',
+        ).order_by('assessment__exam__created_at', 'assessment__exam_id', 'id')
+        if session_id is not None:
+            items = items.filter(assessment__exam__session_id=session_id)
+
+        for item in items:
+            card = cards[item['student_id']]
+            exam_name = item['assessment__exam__name']
+            subject = item['assessment__section_subject__subject__name']
+            if exam_name not in [exam['name'] for exam in card['exams']]:
+                card['exams'].append({
+                    'name': exam_name,
+                    'consolidated': item['assessment__exam__consolidated'],
+                })
+            subject_results = card['results'].setdefault(subject, {})
+            if exam_name in subject_results:  # Keep marks of the earliest exam with this name
+                continue
+            total_marks = item['assessment__total_marks']
+            obtained_marks = item['obtained_marks']
+            marks = [total_marks, obtained_marks]
+            if item['assessment__exam__consolidated']:
+                marks.append(ResultCardService.get_percentage(obtained_marks, total_marks))
+            subject_results[exam_name] = marks
+
+        for card in cards.values():
+            card['subjects'] = sorted(card['results'].keys())
+        return cards
+
+    @staticmethod
+    def get_percentage(obtained_marks, total_marks):
+        if obtained_marks is None or not total_marks:
+            return None
+        return round((obtained_marks / total_marks) * 100, 2)
+
+    @staticmethod
+    def get_rows(card):
+        """
+        Returns rows of the result card in the layout of the downloadable CSV.
+        """
+        exam_name_with_blank_columns = []
+        exam_max_obtained_marks_row = []
+        for exam in card['exams']:
+            if exam['consolidated']:
+                exam_name_with_blank_columns += [exam['name'], "", ""]
+                exam_max_obtained_marks_row += ["Max Marks", "Obtained Marks", "Percentage"]
+            else:
+                exam_name_with_blank_columns += [exam['name'], ""]
+                exam_max_obtained_marks_row += ["Max Marks", "Obtained Marks"]
+        rows = [
+            [''] + exam_name_with_blank_columns,
+            ['Subject'] + exam_max_obtained_marks_row,
+        ]
+        for subject in card['subjects']:
+            row = [subject]
+            for exam in card['exams']:
+                blank = ['', '', ''] if exam['consolidated'] else ['', '']
+                row += card['results'][subject].get(exam['name'], blank)
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def write_result_card(file, card):
+        writer = csv.writer(file, delimiter=',')
+        for row in ResultCardService.get_rows(card):
+            writer.writerow(row)
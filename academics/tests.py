@@ -1,3 +1,58 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from academics import models
+from academics.views import GradeViewSet
+from accounts.models import StudentInfo
+from attendance.models import MonthlySectionAttendance
+from common.models import Session
+from common.references import get_current_session
+from structure.models import Grade, Section
+
+
+class GradeSummaryTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create(
+            name='2019-20', start_date=datetime.date(2019, 4, 1), end_date=datetime.date(2020, 3, 31)
+        )
+        self.teacher = User.objects.create(username='teacher')
+        self.subject = models.Subject.objects.create(name='English')
+
+    def create_grades(self, count):
+        for index in range(count):
+            grade = Grade.objects.create(name=f'Grade {Grade.objects.count() + 1}')
+            for name in ('A', 'B'):
+                section = Section.objects.create(name=name, grade=grade)
+                StudentInfo.objects.create(gr_number=f'{grade.id}-{name}', section=section)
+                models.SectionSubject.objects.create(
+                    section=section, subject=self.subject, teacher=self.teacher
+                )
+                for month in (4, 5):
+                    MonthlySectionAttendance.objects.create(
+                        section=section, session=self.session, month=datetime.date(2019, month, 1),
+                        present=3, total=4,
+                    )
+
+    def test_list_grades_summary_queries(self):
+        # Grades, students, subjects and teachers, attendance and the two remaining totals,
+        # the current session is a cached reference
+        for count in (1, 5):
+            self.create_grades(count)
+            get_current_session()
+            with self.assertNumQueries(6):
+                response = GradeViewSet().list_grades_summary()
+            self.assertEqual(len(response.data['items']), Grade.objects.count())
+            self.assertEqual(response.data['students'], StudentInfo.objects.count())
+            self.assertEqual(response.data['attendance'], 75.0)
+            self.assertEqual(len(response.data['monthly_attendance']), 2)
+            for grade in response.data['items']:
+                self.assertEqual(grade['students'], 2)
+                self.assertEqual(grade['sections'], 2)
+                self.assertEqual(grade['subjects'], 1)
+                self.assertEqual(grade['teachers'], 1)
+                self.assertEqual(grade['attendance'], 75.0)
@@ -14,6 +14,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('exams/<int:pk>/', views.ExamsAPIView.as_view()),
     path('student-result/<int:pk>/', views.StudentResultsAPIView.as_view()),
+    path('result-cards/', views.ResultCardsAPIView.as_view()),
     url(
         'exams/',
         view=views.ExamsAPIView.as_view(),
@@ -1,4 +1,5 @@
-from django.core.paginator import Paginator
+from django.db.models import Count
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
@@ -6,7 +7,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from academics import models, serializers, permissions
-from common.permissions import IsAdmin, IsTeacher
+from common import artifacts
+from common.exports import submit_export
+from common.jobs import submit_job
+from common.pagination import paginate
+from common.permissions import IsAdmin, IsTeacher, has_role
+from common.references import get_current_session, get_reference
 from notifications.serializers import NotificationSerializer
 from structure.models import Grade, Section
 from accounts import models as AccountModels
@@ -14,15 +20,10 @@ from notifications.views import NotificationViewSet
 from attendance.views import DailyStudentAttendanceViewSet
 from rest_framework.views import APIView
 from attendance.serializers import DailyStudentAttendanceSerializer
-from attendance.models import StudentAttendanceItem
+from attendance.services.statistics import AttendanceStatisticsService
 from accounts.serializers import StudentSerializer
 from academics.services import exams
-from django.conf import LazySettings
-import os
-import datetime
-import csv
-
-settings = LazySettings()
+from academics.services.results import ResultCardService
 
 
 class GradeViewSet(ModelViewSet):
@@ -42,9 +43,12 @@ class GradeViewSet(ModelViewSet):
         If summary flag is true, return grades with their summaries
         """
         if 'summary' in request.query_params and \
-                request.user.groups.filter(name='Admin').count() > 0:
+                has_role(request.user, 'Admin'):
             return self.list_grades_summary()
-        return super().list(self, request, args, kwargs)
+        data = get_reference(
+            'grades', lambda: list(self.get_serializer(self.get_queryset(), many=True).data)
+        )
+        return Response(status=status.HTTP_200_OK, data=data)
 
     def retrieve(self, request, *args, **kwargs):
         """
@@ -52,7 +56,7 @@ class GradeViewSet(ModelViewSet):
         If summary flag is true, return grades with their summaries
         """
         if 'summary' in request.query_params and \
-                request.user.groups.filter(name='Admin').count() > 0:
+                has_role(request.user, 'Admin'):
             instance = self.get_object()
             return self.get_grade_summary(instance)
         return super().retrieve(self, request, args, kwargs)
@@ -72,38 +76,52 @@ class GradeViewSet(ModelViewSet):
             iv: Teachers
             v: Attendance
         """
-        grade_set = Grade.objects.filter(
+        # Each count is grouped by grade so the number of queries stays fixed
+        # regardless of the number of grades
+        grade_set = Grade.objects.filter(is_active=True).annotate(
+            section_count=Count('sections', distinct=True)
+        ).values('id', 'name', 'section_count')
+
+        # Grouped over all active students, students without a grade included, so the
+        # groups also add up to the total
+        students = AccountModels.StudentInfo.objects.filter(
             is_active=True
-        )
+        ).values('section__grade_id').annotate(total=Count('id')).order_by()
+        students = {s['section__grade_id']: s['total'] for s in students}
+
+        section_subjects = models.SectionSubject.objects.filter(
+            is_active=True, section__grade__is_active=True
+        ).values('section__grade_id').annotate(
+            subjects=Count('subject_id', distinct=True),
+            teachers=Count('teacher_id', distinct=True),
+        ).order_by()
+        section_subjects = {s['section__grade_id']: s for s in section_subjects}
+
+        session = AttendanceStatisticsService.get_current_session()
+        grade_attendance, attendance, monthly_attendance = \
+            AttendanceStatisticsService.get_attendance_summary(session, 'section__grade_id')
 
         grades = {}
         for grade_info in grade_set:
+            grade_subjects = section_subjects.get(grade_info['id'], {})
             grade = {
-                'id': grade_info.id,
-                'name': grade_info.name,
-                'students': AccountModels.StudentInfo.objects.filter(is_active=True,
-                                                                     section__grade_id=grade_info.id).count(),
-                'subjects': models.SectionSubject.objects.filter(
-                    section__grade_id=grade_info.id, is_active=True).distinct('subject_id').count(),
-                'sections': models.Section.objects.filter(grade_id=grade_info.id).count(),
-                'teachers': models.SectionSubject.objects.filter(
-                    section__grade_id=grade_info.id, is_active=True).distinct('teacher_id').count(),
-                'attendance': 0
+                'id': grade_info['id'],
+                'name': grade_info['name'],
+                'students': students.get(grade_info['id'], 0),
+                'subjects': grade_subjects.get('subjects', 0),
+                'sections': grade_info['section_count'],
+                'teachers': grade_subjects.get('teachers', 0),
+                'attendance': grade_attendance.get(grade_info['id'], 0),
             }
-            grades[grade_info.id] = grade
+            grades[grade_info['id']] = grade
 
         result = {
             'items': grades.values(),
-            'students': AccountModels.StudentInfo.objects.filter(is_active=True).count(),
+            'students': sum(students.values()),
             'teachers': AccountModels.StaffInfo.objects.filter(is_active=True).count(),
             'subjects': models.Subject.objects.filter(is_active=True).count(),
-            'attendance': 79,
-            'monthly_attendance': [
-                {
-                    'month': 'January',
-                    'value': 76
-                }
-            ]
+            'attendance': attendance,
+            'monthly_attendance': monthly_attendance,
         }
 
         return Response(status=status.HTTP_200_OK, data=result)
@@ -111,6 +129,9 @@ class GradeViewSet(ModelViewSet):
         # TODO
 
     def get_grade_summary(self, instance):
+        session = AttendanceStatisticsService.get_current_session()
+        section_attendance, attendance, monthly_attendance = \
+            AttendanceStatisticsService.get_attendance_summary(session, 'section_id', grade_id=instance.id)
 
         sections = {}
         for section_info in instance.sections.all():
@@ -121,7 +142,7 @@ class GradeViewSet(ModelViewSet):
                                                                      section_id=section_info.id).count(),
                 'subjects': models.SectionSubject.objects.filter(
                     section_id=section_info.id, is_active=True).distinct('subject_id').count(),
-                'attendance': 80,
+                'attendance': section_attendance.get(section_info.id, 0),
             }
             sections[section_info.id] = section
         result = {
@@ -132,13 +153,8 @@ class GradeViewSet(ModelViewSet):
             'sections': sections.values(),
             'teachers': models.SectionSubject.objects.filter(
                 section__grade_id=instance.id, is_active=True).distinct('teacher_id').count(),
-            'attendance': 79,
-            'monthly_attendance': [
-                {
-                    'month': 'January',
-                    'value': 76
-                }
-            ]
+            'attendance': attendance,
+            'monthly_attendance': monthly_attendance,
         }
 
         return Response(status=status.HTTP_200_OK, data=result)
@@ -149,23 +165,13 @@ class GradeViewSet(ModelViewSet):
     def notifications(self, request, pk=None):
         params = request.query_params
         queryset = NotificationViewSet.get_filtered_queryset(params)
-        paginator = Paginator(queryset.order_by('-created_at'), 10)
-        if 'recent' in params:
-            paginator = Paginator(queryset.order_by('-created_at'), 5)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-        serializer = NotificationSerializer(page, many=True)
-        results = {}
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        page_size = 5 if 'recent' in params else 10
+        results = paginate(queryset.order_by('-created_at'), params, page_size, NotificationSerializer)
         return Response(status=status.HTTP_200_OK, data=results)
 
 
 class SectionViewSet(ModelViewSet):
-    queryset = Section.objects.filter(is_active=True)
+    queryset = Section.objects.filter(is_active=True).select_related('grade')
     # permission_classes = (IsAdmin, IsTeacher)
     serializer_class = serializers.SectionSerializer
 
@@ -181,7 +187,10 @@ class SectionViewSet(ModelViewSet):
         """
         if 'role' in request.query_params and request.query_params['role'] == 'teacher':
             return self.list_teacher_sections()
-        return super().list(request, args, kwargs)
+        data = get_reference(
+            'sections', lambda: list(self.get_serializer(self.get_queryset(), many=True).data)
+        )
+        return Response(status=status.HTTP_200_OK, data=data)
 
     def list_teacher_sections(self):
         queryset = models.Section.objects.filter(
@@ -196,7 +205,7 @@ class SectionViewSet(ModelViewSet):
         If summary flag is true, return section with their summaries
         """
         if 'summary' in request.query_params and \
-                request.user.groups.filter(name='Admin').count() > 0:
+                has_role(request.user, 'Admin'):
             instance = self.get_object()
             return self.get_section_summary(instance)
         return super().retrieve(self, request, args, kwargs)
@@ -205,18 +214,8 @@ class SectionViewSet(ModelViewSet):
     def notifications(self, request, pk=None):
         params = request.query_params
         queryset = NotificationViewSet.get_filtered_queryset(params)
-        paginator = Paginator(queryset.order_by('-created_at'), 10)
-        if 'recent' in params:
-            paginator = Paginator(queryset.order_by('-created_at'), 5)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-        serializer = NotificationSerializer(page, many=True)
-        results = {}
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        page_size = 5 if 'recent' in params else 10
+        results = paginate(queryset.order_by('-created_at'), params, page_size, NotificationSerializer)
         return Response(status=status.HTTP_200_OK, data=results)
 
     @action(detail=True, methods=['get'])
@@ -227,31 +226,17 @@ class SectionViewSet(ModelViewSet):
             params
         )
         if 'download' in params:
-            queryset = queryset.prefetch_related(
-                'items__student__profile__student_info'
-            ).order_by('date')
-            return self.handle_download_attendance(queryset)
-        paginator = Paginator(queryset, 30)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-        serializer = DailyStudentAttendanceSerializer(page, many=True)
-        results = {}
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+            return self.handle_download_attendance(params, request.user)
+        results = paginate(queryset, params, 30, DailyStudentAttendanceSerializer, ordering='-date')
         return Response(status=status.HTTP_200_OK, data=results)
 
     @action(detail=True, methods=['get'])
     def students(self, request, pk=None):
         instance = self.get_object()
         params = request.query_params
-        queryset = models.User.objects.filter(
-            profile__student_info__section_id=instance.id, is_active=True
-        ).select_related('profile__student_info')
+        queryset = self.get_students_queryset(instance.id)
         if 'download' in params and params['download'] == 'true':
-            return self.get_downloadable_link(queryset)
+            return self.get_downloadable_link(instance.id, params, request.user)
         serializer = StudentSerializer(queryset, many=True)
         return Response(status=status.HTTP_200_OK, data=serializer.data)
 
@@ -347,17 +332,16 @@ class SectionViewSet(ModelViewSet):
             return Response(status=status.HTTP_200_OK, data=data)
 
     @staticmethod
-    def get_downloadable_link(queryset):
-        timestamp = datetime.datetime.now().strftime("%f")
-        file_name = f'section_students_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([
-                'GR Number', 'Full Name', 'Average Attendance'
-            ])
-            for student in queryset:
-                writer.writerow(SectionViewSet.get_csv_row(student))
-        return Response(file_name, status=status.HTTP_200_OK)
+    def get_students_queryset(section_id):
+        return models.User.objects.filter(
+            profile__student_info__section_id=section_id, is_active=True
+        ).select_related('profile__student_info')
+
+    @staticmethod
+    def get_downloadable_link(section_id, params, user):
+        params = params.dict()
+        params['section_id'] = section_id
+        return submit_export('academics.exports.get_section_students_export', params, user)
 
     @staticmethod
     def get_csv_row(student):
@@ -366,36 +350,8 @@ class SectionViewSet(ModelViewSet):
         ]
 
     @staticmethod
-    def handle_download_attendance(queryset):
-        timestamp = datetime.datetime.now().strftime("%f")
-        dates = []
-        students = {}
-        date_format = '%d/%m/%Y'
-        for attendance in queryset:
-            formatted_date = attendance.date.strftime(date_format)
-            dates.append(formatted_date)
-            for item in attendance.items.all():
-                student_name = f'{item.student.profile.fullname} ({item.student.profile.student_info.gr_number})'
-                if student_name not in students:
-                    students[student_name] = {}
-                    students[student_name]['total_presents'] = 0
-                attendance_status = ''
-                if item.status == StudentAttendanceItem.PRESENT:
-                    attendance_status = 'P'
-                    students[student_name]['total_presents'] = students[student_name]['total_presents'] + 1
-                elif item.status == StudentAttendanceItem.ABSENT:
-                    attendance_status = 'A'
-                elif item.status == StudentAttendanceItem.LEAVE:
-                    attendance_status = 'L'
-                students[student_name][formatted_date] = attendance_status
-
-        file_name = f'attendance_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow(['Student'] + ['Average %'] + dates)
-            for key, statuses in students.items():
-                writer.writerow(SectionViewSet.get_attendance_row(key, statuses, dates))
-        return Response(status=status.HTTP_200_OK, data=file_name)
+    def handle_download_attendance(params, user):
+        return submit_export('academics.exports.get_section_attendance_export', params.dict(), user)
 
     @staticmethod
     def get_attendance_row(student, values, dates):
@@ -403,6 +359,10 @@ class SectionViewSet(ModelViewSet):
         return [student] + [average_attendance] + [values[date] if date in values else '' for date in dates]
 
     def get_section_summary(self, instance):
+        session = AttendanceStatisticsService.get_current_session()
+        attendance, monthly_attendance = AttendanceStatisticsService.get_monthly_attendance(
+            session, section_id=instance.id
+        )
         result = {
             'section_name': instance.name,
             'grade_name': instance.grade.name,
@@ -411,13 +371,8 @@ class SectionViewSet(ModelViewSet):
                 section_id=instance.id, is_active=True).distinct('subject_id').count(),
             'teachers': models.SectionSubject.objects.filter(
                 section_id=instance.id, is_active=True).distinct('teacher_id').count(),
-            'attendance': 79,
-            'monthly_attendance': [
-                {
-                    'month': 'January',
-                    'value': 76
-                }
-            ]
+            'attendance': attendance,
+            'monthly_attendance': monthly_attendance,
         }
 
         return Response(status=status.HTTP_200_OK, data=result)
@@ -447,7 +402,7 @@ class AssessmentViewSet(ModelViewSet):
         instance = self.get_object()
         params = request.query_params
         if 'download' in params and params['download'] == 'true':
-            return self.get_downloadable_link(instance)
+            return self.get_downloadable_link(instance, params, request.user)
         serializer = serializers.AssessmentDetailsSerializer(
             instance=instance
         )
@@ -462,17 +417,19 @@ class AssessmentViewSet(ModelViewSet):
         if 'items' in data:
             items = instance.items.all()
             items = {i.id: i for i in items}
+            now = timezone.now()
             for item in data['items']:
                 matched_item = items.get(item['id'], None)
                 if matched_item is None:
                     continue
                 matched_item.obtained_marks = item['obtained_marks']
+                matched_item.updated_at = now
                 if 'comments' in item:
                     matched_item.comments = item['comments']
             items = items.values()
             if len(items) > 0:
                 models.StudentAssessment.objects.bulk_update(
-                    items, ['obtained_marks', 'comments']
+                    items, ['obtained_marks', 'comments', 'updated_at']
                 )
                 instance.save()
         return Response(status=status.HTTP_200_OK)
@@ -480,22 +437,12 @@ class AssessmentViewSet(ModelViewSet):
     @staticmethod
     def get_assessments(params, section_id):
         queryset = AssessmentViewSet.get_filtered_queryset(params, section_id)
-        paginator = Paginator(queryset, 20)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-        serializer = serializers.AssessmentSerializer(page, many=True)
-        results = {}
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
-        return results
+        return paginate(queryset, params, 20, serializers.AssessmentSerializer, ordering='-date')
 
     @staticmethod
     def add_assessment(data):
         data = data.copy()
-        data['session_id'] = models.Session.objects.filter(is_active=True).first().id
+        data['session_id'] = get_current_session().id
         serializer = serializers.AssessmentSerializer(data=data)
         try:
             if serializer.is_valid(raise_exception=True):
@@ -525,22 +472,10 @@ class AssessmentViewSet(ModelViewSet):
         return queryset.order_by('-date')
 
     @staticmethod
-    def get_downloadable_link(instance):
-        instance = models.Assessment.objects.filter(id=instance.id).prefetch_related(
-            'items__student__profile__student_info').first()
-        date = instance.date.strftime('%Y_%m_%d')
-        grade = instance.section_subject.section.grade
-        section = instance.section_subject.section.name
-        name = instance.name.replace(" ", "_")
-        file_name = f'{grade}_{section}_{name}_{date}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([
-                'GR Number', 'Full Name', 'Obtained Marks', 'Comments'
-            ])
-            for assessment_item in instance.items.all():
-                writer.writerow(AssessmentViewSet.get_csv_row(assessment_item))
-        return Response(file_name, status=status.HTTP_200_OK)
+    def get_downloadable_link(instance, params, user):
+        params = params.dict()
+        params['assessment_id'] = instance.id
+        return submit_export('academics.exports.get_assessment_export', params, user)
 
     @staticmethod
     def get_csv_row(item):
@@ -567,6 +502,12 @@ class SubjectViewSet(ModelViewSet):
         instance.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def list(self, request, *args, **kwargs):
+        data = get_reference(
+            'subjects', lambda: list(self.get_serializer(self.get_queryset(), many=True).data)
+        )
+        return Response(status=status.HTTP_200_OK, data=data)
+
 
 class ExamsAPIView(APIView):
     # permission_classes = [IsAdmin, IsTeacher]
@@ -575,7 +516,9 @@ class ExamsAPIView(APIView):
         data = request.data
         try:
             if "consolidated" in data:
-                exams.ExamService.create_consolidated_exam(data['name'], data['section'], data['exam_ids'])
+                exams.ExamService.create_consolidated_exam(
+                    data['name'], data['section'], data['exam_ids'], data.get('weights', None)
+                )
             else:
                 exams.ExamService.create_exam(data['name'], data['date'], data['section'], data['section_subjects'])
         except Exception as e:
@@ -597,16 +540,7 @@ class ExamsAPIView(APIView):
         queryset = models.Exam.objects.filter(is_active=True, section_id=params['section_id'])
         if 'section_subject_id' in params:
             queryset = queryset.filter(assessments__section_subject_id=params['section_subject_id'])
-        paginator = Paginator(queryset.order_by('-created_at'), 20)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-        serializer = serializers.ExamSerializer(page, many=True)
-        results = {}
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        results = paginate(queryset.order_by('-created_at'), params, 20, serializers.ExamSerializer)
         return Response(status=status.HTTP_200_OK, data=results)
 
 
@@ -614,68 +548,29 @@ class StudentResultsAPIView(APIView):
     # permission_classes = [IsAdmin, IsTeacher]
 
     def get(self, request, pk):
-        student = models.User.objects.get(id=pk)
-        exams = models.Exam.objects.filter(
-            assessments__items__student_id=pk).distinct().values(
-            'name',
-            'assessments__section_subject__subject__name',
-        ).order_by('assessments__section_subject__subject__name')
-        data = {}
-        exam_subjects = exams.distinct().values_list('assessments__section_subject__subject__name', flat=True)
-        exam_subjects = [assessments__section_subject__subject__name for assessments__section_subject__subject__name in
-                         exam_subjects]
-        exam_names = exams.distinct().values_list('name', flat=True).order_by('created_at')
-        exam_names_with_types = exams.distinct().values('name', 'consolidated').order_by('created_at')
-        # exam_names = [name for name in exam_names]
-        results = {}
-        for subject in exam_subjects:
-            results[subject] = {}
-            for exam_name in exam_names:
-                results[subject][exam_name] = exams.filter(
-                    assessments__section_subject__subject__name=subject, name=exam_name,
-                    assessments__items__student_id=pk).values(
-                    'assessments__items__obtained_marks', 'assessments__total_marks', 'consolidated').first()
-        finalized_result = {}
-        for key in results:
-            finalized_result[key] = {}
-            for exam in results[key]:
-                if results[key][exam]['consolidated']:
-                    finalized_result[key][exam] = [
-                        results[key][exam]['assessments__total_marks'],
-                        results[key][exam]['assessments__items__obtained_marks'],
-                        round((
-                                results[key][exam]['assessments__items__obtained_marks'] /
-                                results[key][exam]['assessments__total_marks']
-                        ) * 100, 2)
-                    ]
-                else:
-                    finalized_result[key][exam] = [
-                        results[key][exam]['assessments__total_marks'],
-                        results[key][exam]['assessments__items__obtained_marks']
-                    ]
-        exam_max_obtained_marks_row = []
-        exam_name_with_blank_columns = []
-        for exam in exam_names_with_types.all():
-            if exam['consolidated']:
-                exam_name_with_blank_columns += [exam['name'], "", ""]
-                exam_max_obtained_marks_row += ["Max Marks", "Obtained Marks", "Percentage"]
-            else:
-                exam_name_with_blank_columns += [exam['name'], ""]
-                exam_max_obtained_marks_row += ["Max Marks", "Obtained Marks"]
-        timestamp = datetime.datetime.now().strftime("%f")
-        fullname = student.profile.fullname.lower().replace(' ', '_')
-        file_name = f'result_card_{fullname}_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w', newline='') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([''] + exam_name_with_blank_columns)
-            writer.writerow(['Subject'] + exam_max_obtained_marks_row)
-            for subject in exam_subjects:
-                writer.writerow(StudentResultsAPIView.get_row(subject, finalized_result[subject]))
+        card = ResultCardService.get_student_result_card(pk)
+        if card is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        fullname = card['fullname'].lower().replace(' ', '_')
+        name = f'result_card_{fullname}_{card["student_id"]}.csv'
+        file_name = artifacts.new_file_name(name)
+        with open(artifacts.get_path(file_name), mode='w', newline='') as file:
+            ResultCardService.write_result_card(file, card)
+        artifacts.save_artifact(name, file_name)
         return Response(status=status.HTTP_200_OK, data=file_name)
 
-    @staticmethod
-    def get_row(key, result):
-        combined_values = []
-        for item in result.values():
-            combined_values += item
-        return [key] + combined_values
+
+class ResultCardsAPIView(APIView):
+    permission_classes = [IsAdmin | IsTeacher]
+
+    def post(self, request):
+        """
+        Submits a job generating result cards of all students in a section, grade or session.
+        Progress and the generated archive are available through the job status endpoint.
+        """
+        serializer = serializers.ResultCardsJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = submit_job(
+            'academics.jobs.generate_result_cards', serializer.validated_data, request.user
+        )
+        return Response(status=status.HTTP_202_ACCEPTED, data={'id': job.id})
@@ -0,0 +1,17 @@
+from accounts.views import StaffAPIView, StudentAPIView
+from common.exports import get_file_name
+
+
+def get_students_export(**params):
+    queryset = StudentAPIView.get_filtered_queryset(params)
+    return get_file_name('students'), [
+        'Roll #', 'Name', 'Section', 'Guardian',
+        'Contact', 'Gender', 'Date of Birth', 'Date Enrolled', 'Address',
+    ], queryset, StudentAPIView.get_csv_row
+
+
+def get_staff_export(**params):
+    queryset = StaffAPIView.get_filtered_queryset(params)
+    return get_file_name('staff'), [
+        'Full Name', 'Date Hired', 'Designation', 'Contact', 'Address'
+    ], queryset, StaffAPIView.get_csv_row
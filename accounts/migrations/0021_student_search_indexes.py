@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Trigram indexes serve icontains/istartswith lookups, which compare UPPER(column),
+# and the trigram_similar lookup on fullname used for misspelt names
+INDEXES = (
+    ('accounts_profile_fullname_upper_trgm', 'accounts_profile', 'UPPER("fullname") gin_trgm_ops'),
+    ('accounts_profile_fullname_trgm', 'accounts_profile', '"fullname" gin_trgm_ops'),
+    ('accounts_studentinfo_gr_number_upper_trgm', 'accounts_studentinfo', 'UPPER("gr_number") gin_trgm_ops'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression in INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({expression})')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_auto_20191008_1531'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -245,6 +245,7 @@ class StudentFilterSerializer(serializers.Serializer):
     grade_id = serializers.IntegerField()
     section_id = serializers.IntegerField(required=False)
     search_term = serializers.CharField(max_length=128, required=False)
+    arrears_above = serializers.FloatField(required=False)
     page = serializers.IntegerField(allow_null=True, required=False)
 
 
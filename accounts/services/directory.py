@@ -0,0 +1,202 @@
+import bisect
+import logging
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import connection
+
+from accounts import models
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'student_directory_version'
+MAX_AGE = 60 * 5  # Bounds staleness for caches not shared between workers and bulk updates
+# Fields kept by the directory, saves updating other fields only do not make it stale
+DIRECTORY_FIELDS = {
+    'fullname', 'is_active', 'profile_type', 'user', 'user_id', 'student_info', 'student_info_id',
+    'gr_number', 'gender', 'section', 'section_id',
+}
+
+
+class DirectoryEntry:
+    __slots__ = ('id', 'user_id', 'fullname', 'gr_number', 'gender', 'section_id', 'sort_key')
+
+    def __init__(self, id, user_id, fullname, gr_number, gender, section_id):
+        self.id = id
+        self.user_id = user_id
+        self.fullname = fullname
+        self.gr_number = gr_number
+        self.gender = gender
+        self.section_id = section_id
+        self.sort_key = fullname.lower()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'fullname': self.fullname,
+            'gr_number': self.gr_number,
+            'gender': self.gender,
+            'user_id': self.user_id,
+        }
+
+
+class StudentDirectory:
+    '''
+    In-memory index of active students for autocomplete. GR numbers and names, from
+    the start of each word, are kept in sorted lists for prefix lookups and both are
+    indexed by trigrams for substring lookups. Results are ranked like
+    StudentSearchService.search.
+    '''
+
+    _instance = None
+    _lock = threading.Lock()
+    _refreshing = False
+
+    def __init__(self, entries, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.entries = {entry.id: entry for entry in entries}
+        self.gr_numbers = sorted((entry.gr_number.lower(), entry.id) for entry in entries)
+        self.names = []
+        self.trigrams = {}
+        for entry in entries:
+            name = entry.sort_key
+            position = 0
+            for word in name.split(' '):
+                if word:
+                    self.names.append((name[position:], position == 0, entry.id))
+                position += len(word) + 1
+            for trigram in self.get_trigrams(name) | self.get_trigrams(entry.gr_number.lower()):
+                self.trigrams.setdefault(trigram, set()).add(entry.id)
+        self.names.sort()
+
+    @staticmethod
+    def get_trigrams(value):
+        return {value[index:index + 3] for index in range(len(value) - 2)}
+
+    @staticmethod
+    def get_version():
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(VERSION_CACHE_KEY, version, None)
+            version = cache.get(VERSION_CACHE_KEY, version)
+        return version
+
+    def is_stale(self, version):
+        return self.version != version or time.monotonic() - self.loaded_at >= MAX_AGE
+
+    @classmethod
+    def get(cls):
+        """
+        Returns the directory, loading it on first use. Once students changed since it
+        was loaded or it is older than MAX_AGE, it is rebuilt in a background thread
+        while requests keep being served from the loaded one.
+        """
+        version = cls.get_version()
+        directory = cls._instance
+        if directory is None:
+            with cls._lock:
+                directory = cls._instance
+                if directory is None:
+                    directory = cls(cls.load_entries(), version)
+                    cls._instance = directory
+        elif directory.is_stale(version):
+            with cls._lock:
+                refresh = not cls._refreshing
+                cls._refreshing = True
+            if refresh:
+                threading.Thread(target=cls.refresh, daemon=True).start()
+        return directory
+
+    @classmethod
+    def refresh(cls):
+        try:
+            version = cls.get_version()
+            directory = cls(cls.load_entries(), version)
+            with cls._lock:
+                cls._instance = directory
+        except Exception:
+            logger.exception('Student directory could not be rebuilt')
+        finally:
+            with cls._lock:
+                cls._refreshing = False
+            connection.close()  # Thread does not go through request cleanup
+
+    @staticmethod
+    def load_entries():
+        rows = models.Profile.objects.filter(
+            is_active=True, profile_type=models.Profile.STUDENT, student_info_id__isnull=False
+        ).values_list(
+            'id', 'user_id', 'fullname', 'student_info__gr_number',
+            'student_info__gender', 'student_info__section_id'
+        )
+        return [DirectoryEntry(*row) for row in rows.iterator()]
+
+    @staticmethod
+    def invalidate():
+        """
+        Marks loaded directories of all workers sharing the cache as stale, each worker
+        rebuilds its directory in the background on its next search.
+        """
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+    def search(self, term, limit=20):
+        """
+        Returns students matching the term.
+
+        Parameters:
+            term (str): GR number or name, or a part of it
+            limit (int): Maximum number of results
+
+        Returns:
+            [dict]: Students ordered by rank and name
+        """
+        term = term.strip().lower()
+        if not term:
+            return []
+        ranks = {}
+
+        def add(entry_id, rank):
+            if ranks.get(entry_id, rank + 1) > rank:
+                ranks[entry_id] = rank
+
+        index = bisect.bisect_left(self.gr_numbers, (term,))
+        while index < len(self.gr_numbers) and self.gr_numbers[index][0].startswith(term):
+            gr_number, entry_id = self.gr_numbers[index]
+            add(entry_id, 0 if gr_number == term else 1)
+            index += 1
+
+        index = bisect.bisect_left(self.names, (term,))
+        while index < len(self.names) and self.names[index][0].startswith(term):
+            _, is_first_word, entry_id = self.names[index]
+            add(entry_id, 2 if is_first_word else 3)
+            index += 1
+
+        if len(ranks) < limit:
+            for entry in self.get_containing(term):
+                add(entry.id, 4)
+
+        entries = sorted(
+            (self.entries[entry_id] for entry_id in ranks),
+            key=lambda entry: (ranks[entry.id], entry.sort_key)
+        )
+        return [entry.to_dict() for entry in entries[:limit]]
+
+    def get_containing(self, term):
+        if len(term) < 3:  # Too short for trigrams
+            entries = self.entries.values()
+        else:
+            ids = None
+            for trigram in self.get_trigrams(term):
+                matches = self.trigrams.get(trigram, set())
+                ids = matches if ids is None else ids & matches
+                if not ids:
+                    break
+            entries = [self.entries[entry_id] for entry_id in ids]
+        return [
+            entry for entry in entries
+            if term in entry.sort_key or term in entry.gr_number.lower()
+        ]
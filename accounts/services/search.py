@@ -0,0 +1,62 @@
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from accounts import models
+
+
+class StudentSearchService:
+    '''
+    Service for searching students by GR number or name. On PostgreSQL substring and
+    prefix matches are served by trigram indexes and misspelt names are matched by
+    similarity, other databases fall back to plain substring matching. Each indexed
+    column is searched in a subquery of its own table, so an OR across the join of
+    profiles and student infos does not keep the planner from using either index.
+    '''
+
+    @staticmethod
+    def search(queryset, term, prefix='', rank=True):
+        """
+        Filters queryset to students matching the term.
+        
+        Parameters:
+            queryset (QuerySet): Queryset of Profile or of a model related to it
+            term (str): GR number or name, or a part of it
+            prefix (str): Lookup path from model of the queryset to Profile, e.g. student__profile__
+            rank (bool): Whether to order results by rank, exact GR number first followed by
+                GR number prefix, name prefix, name word prefix, substring and similar names
+        
+        Returns:
+            QuerySet: Filtered queryset
+        """
+        gr_number = f'{prefix}student_info__gr_number'
+        fullname = f'{prefix}fullname'
+        postgres = connections[queryset.db].vendor == 'postgresql'
+        names = Q(fullname__icontains=term)
+        if postgres:
+            names = names | Q(fullname__trigram_similar=term)
+        queryset = queryset.filter(
+            Q(**{f'{prefix}id__in': models.Profile.objects.filter(names).values('id')}) |
+            Q(**{f'{prefix}student_info__in': models.StudentInfo.objects.filter(
+                gr_number__icontains=term
+            ).values('id')})
+        )
+        if not rank:
+            return queryset
+
+        contains = Q(**{f'{gr_number}__icontains': term}) | Q(**{f'{fullname}__icontains': term})
+
+        ordering = ['search_rank']
+        queryset = queryset.annotate(search_rank=Case(
+            When(**{f'{gr_number}__iexact': term}, then=Value(0)),
+            When(**{f'{gr_number}__istartswith': term}, then=Value(1)),
+            When(**{f'{fullname}__istartswith': term}, then=Value(2)),
+            When(**{f'{fullname}__icontains': f' {term}'}, then=Value(3)),
+            When(contains, then=Value(4)),
+            default=Value(5),
+            output_field=IntegerField(),
+        ))
+        if postgres:
+            from django.contrib.postgres.search import TrigramSimilarity
+            queryset = queryset.annotate(search_similarity=TrigramSimilarity(fullname, term))
+            ordering.append('-search_similarity')
+        return queryset.order_by(*ordering, fullname)
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts import models
+from accounts.services.directory import DIRECTORY_FIELDS, StudentDirectory
+
+
+@receiver(post_save, sender=models.Profile)
+@receiver(post_delete, sender=models.Profile)
+@receiver(post_save, sender=models.StudentInfo)
+@receiver(post_delete, sender=models.StudentInfo)
+def student_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not DIRECTORY_FIELDS & set(update_fields):
+        return
+    StudentDirectory.invalidate()
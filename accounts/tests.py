@@ -1,3 +1,36 @@
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts import models
+
+
+class StudentListTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username='admin')
+        user.groups.add(Group.objects.create(name='Admin'))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        for gr_number, fullname in (('12', 'Zain'), ('120', 'Bilal'), ('312', 'Ahmed')):
+            student = User.objects.create(username=gr_number)
+            models.Profile.objects.create(
+                user=student, fullname=fullname, profile_type=models.Profile.STUDENT,
+                student_info=models.StudentInfo.objects.create(gr_number=gr_number),
+            )
+
+    def get_names(self, params):
+        response = self.client.get('/api/v1/users/students/', dict(params, grade_id=-1))
+        self.assertEqual(response.status_code, 200)
+        return [row['fullname'] for row in response.data['data']]
+
+    def test_cursor_keeps_search_rank(self):
+        # Exact GR number first, then GR number prefix and substring, the reverse of names
+        ranked = ['Zain', 'Bilal', 'Ahmed']
+        self.assertEqual(self.get_names({'search_term': '12'}), ranked)
+        self.assertEqual(self.get_names({'search_term': '12', 'cursor': ''}), ranked)
+
+    def test_cursor_pages_by_name(self):
+        self.assertEqual(self.get_names({'cursor': ''}), ['Ahmed', 'Bilal', 'Zain'])
@@ -1,4 +1,3 @@
-import csv
 from django.db.models import Q
 from rest_auth.views import LoginView
 from django.conf import LazySettings
@@ -7,11 +6,12 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts import models, serializers
+from accounts.services.directory import StudentDirectory
+from accounts.services.search import StudentSearchService
+from common.exports import submit_export
+from common.pagination import paginate
 from common.permissions import IsAdmin, IsHR, IsAccountant
-from django.core.paginator import Paginator
 from django.http import HttpResponse
-import os
-import datetime
 settings = LazySettings()
 
 
@@ -44,10 +44,13 @@ class StudentsAutocompleteAPIView(APIView):
         if q is None:  # Send empty list
             return Response(status=status.HTTP_200_OK, data=[])
 
+        if settings.STUDENT_DIRECTORY_ENABLED:
+            return Response(status=status.HTTP_200_OK, data=StudentDirectory.get().search(q))
+
         queryset = models.Profile.objects.filter(
-            Q(student_info__gr_number__icontains=q) | Q(fullname__icontains=q),
             student_info_id__isnull=False, is_active=True
-        ).select_related('student_info')[:20]
+        ).select_related('student_info')
+        queryset = StudentSearchService.search(queryset, q)[:20]
 
         serializer = serializers.StudentProfileSerializer(queryset, many=True)
         return Response(status=status.HTTP_200_OK, data=serializer.data)
@@ -74,19 +77,13 @@ class StudentAPIView(APIView):
         params = request.query_params
         queryset = self.get_filtered_queryset(params)
         if 'download' in params and params['download'] == 'true':
-            return self.get_downloadable_link(queryset)
-
-        results = {}
-        paginator = Paginator(queryset, 20)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
+            return self.get_downloadable_link(params, request.user)
 
-        serializer = serializers.StudentDetailsSerializer(page, many=True)
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        # Search results are ordered by rank, which a keyset on fullname would replace
+        ordering = None if len(params.get('search_term', '')) > 0 else 'fullname'
+        results = paginate(
+            queryset, params, 20, serializers.StudentDetailsSerializer, ordering=ordering
+        )
         return Response(status=status.HTTP_200_OK, data=results)
 
     def delete(self, request):
@@ -125,18 +122,8 @@ class StudentAPIView(APIView):
         return Response(status=status.HTTP_200_OK)
 
     @staticmethod
-    def get_downloadable_link(queryset):
-        timestamp = datetime.datetime.now().strftime("%f")
-        file_name = f'students_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([
-                'Roll #', 'Name', 'Section', 'Guardian',
-                'Contact', 'Gender', 'Date of Birth', 'Date Enrolled', 'Address',
-            ])
-            for profile in queryset:
-                writer.writerow(StudentAPIView.get_csv_row(profile))
-        return Response(file_name, status=status.HTTP_200_OK)
+    def get_downloadable_link(params, user):
+        return submit_export('accounts.exports.get_students_export', params.dict(), user)
 
     @staticmethod
     def get_csv_row(profile):
@@ -175,9 +162,11 @@ class StudentAPIView(APIView):
                 )
 
         if 'search_term' in params and len(params['search_term']) > 0:
-            q = params['search_term']
+            queryset = StudentSearchService.search(queryset, params['search_term'])
+
+        if 'arrears_above' in params:
             queryset = queryset.filter(
-                Q(student_info__gr_number__icontains=q) | Q(fullname__icontains=q),
+                user__balance__outstanding__gt=filter_serializer.validated_data['arrears_above']
             )
 
         queryset = queryset.select_related('student_info__section__grade')
@@ -214,19 +203,11 @@ class StaffAPIView(APIView):
             return self.get_dropdown_list(params)
 
         if 'download' in params and params['download'] == 'true':
-            return self.get_downloadable_link(queryset)
-
-        results = {}
-        paginator = Paginator(queryset, 20)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
+            return self.get_downloadable_link(params, request.user)
 
-        serializer = serializers.StaffDetailsSerializer(page, many=True)
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        results = paginate(
+            queryset, params, 20, serializers.StaffDetailsSerializer, ordering='fullname'
+        )
         return Response(status=status.HTTP_200_OK, data=results)
 
     @staticmethod
@@ -278,17 +259,8 @@ class StaffAPIView(APIView):
         return Response(status=status.HTTP_200_OK)
 
     @staticmethod
-    def get_downloadable_link(queryset):
-        timestamp = datetime.datetime.now().strftime("%f")
-        file_name = f'staff_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([
-                'Full Name', 'Date Hired', 'Designation', 'Contact', 'Address'
-            ])
-            for profile in queryset:
-                writer.writerow(StaffAPIView.get_csv_row(profile))
-        return Response(file_name, status=status.HTTP_200_OK)
+    def get_downloadable_link(params, user):
+        return submit_export('accounts.exports.get_staff_export', params.dict(), user)
 
     @staticmethod
     def get_csv_row(profile):
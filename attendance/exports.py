@@ -0,0 +1,16 @@
+from attendance import models
+from attendance.views import DailyStudentAttendanceViewSet
+
+
+def get_attendance_export(attendance_id, **params):
+    instance = models.DailyStudentAttendance.objects.filter(id=attendance_id).select_related(
+        'section__grade'
+    ).first()
+    date = instance.date.strftime('%Y_%m_%d')
+    grade = instance.section.grade
+    section = instance.section.name
+    file_name = f'{grade}_{section}_attendance_{date}.csv'
+    items = instance.items.all().select_related('student__profile__student_info')
+    return file_name, [
+        'GR Number', 'Full Name', 'Status', 'Comments'
+    ], items, DailyStudentAttendanceViewSet.get_csv_row
@@ -0,0 +1,136 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from academics import models as academics_models
+from academics.views import AssessmentViewSet
+from accounts import models as accounts_models
+from attendance import models
+from attendance.services.rollups import AttendanceRollupService
+from attendance.views import DailyStudentAttendanceViewSet
+from common.benchmarks import analyze, get_keyset_page_queryset, run_cases
+from common.references import get_current_session
+
+
+class Command(BaseCommand):
+    """
+    Seeds dummy attendances and assessments and measures attendance and assessment queries
+    """
+    help = "Creates dummy attendances and assessments, then runs their queries under EXPLAIN ANALYZE"
+
+    BATCH_SIZE = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=0,
+            help='Number of past weekdays on which attendance of every section is created')
+        parser.add_argument(
+            '--assessments', type=int, default=0,
+            help='Number of dummy assessments to create for each section subject')
+        parser.add_argument('--runs', type=int, default=5, help='Times each query is run')
+        parser.add_argument('--page', type=int, default=10, help='Page measured deep in cursor paginated lists')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN ANALYZE requires PostgreSQL')
+        session = get_current_session()
+        if session is None:
+            raise CommandError('No active session found')
+        if options['days'] > 0:
+            created = self.create_attendances(session, options['days'])
+            self.stdout.write(f'Created {created} attendances.')
+        if options['assessments'] > 0:
+            created = self.create_assessments(session, options['assessments'])
+            self.stdout.write(f'Created {created} assessments.')
+        section_id = models.DailyStudentAttendance.objects.filter(
+            is_active=True
+        ).order_by('-date').values_list('section_id', flat=True).first()
+        if section_id is None:
+            raise CommandError('No attendance found, create some with --days')
+        run_cases(self, self.get_cases(section_id, options['page']), options['runs'])
+
+    def create_attendances(self, session, days):
+        students = {}
+        for user_id, section_id in accounts_models.Profile.objects.filter(
+                is_active=True, profile_type=accounts_models.Profile.STUDENT,
+                student_info__section_id__isnull=False
+        ).values_list('user_id', 'student_info__section_id'):
+            students.setdefault(section_id, []).append(user_id)
+        dates = []
+        date = datetime.date.today()
+        while len(dates) < days:
+            date -= datetime.timedelta(days=1)
+            if date.weekday() < 5:
+                dates.append(date)
+        existing = set(models.DailyStudentAttendance.objects.filter(
+            is_active=True, date__in=dates
+        ).values_list('section_id', 'date'))
+
+        created = 0
+        for date in dates:
+            attendances = [
+                models.DailyStudentAttendance(
+                    section_id=section_id, date=date, session_id=session.id, average_attendance=90
+                )
+                for section_id in students if (section_id, date) not in existing
+            ]
+            models.DailyStudentAttendance.objects.bulk_create(attendances)
+            items = [
+                models.StudentAttendanceItem(
+                    attendance_id=attendance.id, student_id=student_id, date=date,
+                    status=models.StudentAttendanceItem.ABSENT if index % 10 == 0
+                    else models.StudentAttendanceItem.PRESENT,
+                )
+                for attendance in attendances
+                for index, student_id in enumerate(students[attendance.section_id])
+            ]
+            models.StudentAttendanceItem.objects.bulk_create(items, batch_size=self.BATCH_SIZE)
+            created += len(attendances)
+        AttendanceRollupService.rebuild(session=session)
+        analyze(models.DailyStudentAttendance, models.StudentAttendanceItem)
+        return created
+
+    def create_assessments(self, session, count):
+        section_subjects = list(academics_models.SectionSubject.objects.filter(is_active=True))
+        today = datetime.date.today()
+        assessments = [
+            academics_models.Assessment(
+                name=f'Dummy {index}', section_subject_id=section_subject.id, session_id=session.id,
+                total_marks=20, date=today - datetime.timedelta(days=7 * index),
+            )
+            for section_subject in section_subjects
+            for index in range(count)
+        ]
+        academics_models.Assessment.objects.bulk_create(assessments, batch_size=self.BATCH_SIZE)
+        analyze(academics_models.Assessment)
+        return len(assessments)
+
+    @staticmethod
+    def get_cases(section_id, page):
+        today = datetime.date.today()
+        year = {
+            'section_id': section_id,
+            'start_date': (today - datetime.timedelta(days=365)).isoformat(),
+            'end_date': today.isoformat(),
+        }
+        latest = models.DailyStudentAttendance.objects.filter(
+            is_active=True, section_id=section_id
+        ).order_by('-date').first()
+        attendances = DailyStudentAttendanceViewSet.get_filtered_queryset(year)
+        assessments = AssessmentViewSet.get_filtered_queryset(year, section_id)
+        return [
+            ('attendance of a section on a day', models.DailyStudentAttendance.objects.filter(
+                is_active=True, section_id=section_id, date=latest.date
+            ).values('id')[:1], False),
+            ('attendances of a section in a year, page 1', attendances[:30], False),
+            ('attendances of a section in a year, count', attendances, True),
+            (f'attendances of a section, cursor page {page}', get_keyset_page_queryset(
+                DailyStudentAttendanceViewSet.get_filtered_queryset({'section_id': section_id}),
+                page, 30, '-date'
+            ), False),
+            ('items of an attendance', models.StudentAttendanceItem.objects.filter(
+                attendance_id=latest.id, is_active=True
+            ), False),
+            ('assessments of a section in a year, page 1', assessments[:20], False),
+        ]
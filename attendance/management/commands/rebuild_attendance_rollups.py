@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.services.rollups import AttendanceRollupService
+from common.models import Session
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds attendance rollups from attendance items
+    """
+    help = "Recomputes daily and monthly attendance rollups from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--session', type=int, default=None,
+            help='Id of the session to rebuild, all sessions are rebuilt if omitted')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows written per query')
+
+    def handle(self, *args, **options):
+        session = None
+        if options['session'] is not None:
+            session = Session.objects.filter(id=options['session']).first()
+            if session is None:
+                raise CommandError('Session does not exist')
+
+        daily, sections, students = AttendanceRollupService.rebuild(
+            session=session, batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f'Rebuilt {daily} daily attendances, {sections} monthly section '
+            f'and {students} monthly student rollups.'
+        )
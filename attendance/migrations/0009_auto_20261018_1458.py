@@ -0,0 +1,77 @@
+# Generated by Django 2.2.1 on 2026-10-18 14:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('structure', '0005_auto_20191104_1142'),
+        ('common', '0003_session'),
+        ('attendance', '0008_auto_20191009_1913'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailystudentattendance',
+            name='absent',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailystudentattendance',
+            name='leave',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailystudentattendance',
+            name='present',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailystudentattendance',
+            name='total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='MonthlyStudentAttendance',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('present', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('leave', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('month', models.DateField()),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_student_attendances', to='structure.Section')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_student_attendances', to='common.Session')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'section', 'session', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySectionAttendance',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('present', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('leave', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('month', models.DateField()),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendances', to='structure.Section')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_section_attendances', to='common.Session')),
+            ],
+            options={
+                'unique_together': {('section', 'session', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:34
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deactivate_duplicates(apps, schema_editor):
+    # Attendances taken twice for a section on a day are kept once, preferring one
+    # which was marked, others are deactivated along with their items
+    DailyStudentAttendance = apps.get_model('attendance', 'DailyStudentAttendance')
+    StudentAttendanceItem = apps.get_model('attendance', 'StudentAttendanceItem')
+    duplicates = DailyStudentAttendance.objects.filter(
+        is_active=True, section_id__isnull=False
+    ).values('section_id', 'date').annotate(count=Count('id')).filter(count__gt=1).order_by()
+    for duplicate in duplicates:
+        attendances = DailyStudentAttendance.objects.filter(
+            is_active=True, section_id=duplicate['section_id'], date=duplicate['date']
+        ).order_by(models.F('average_attendance').desc(nulls_last=True), 'id')
+        ids = list(attendances.values_list('id', flat=True))[1:]
+        DailyStudentAttendance.objects.filter(id__in=ids).update(is_active=False)
+        StudentAttendanceItem.objects.filter(attendance_id__in=ids).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_auto_20261018_1458'),
+    ]
+
+    operations = [
+        migrations.RunPython(deactivate_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailystudentattendance',
+            constraint=models.UniqueConstraint(condition=models.Q(is_active=True), fields=('section', 'date'), name='attendance_unique_section_date'),
+        ),
+    ]
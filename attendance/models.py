@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from common.models import BaseModel, Session
 from django.contrib.auth import get_user_model
 from structure.models import Section
@@ -6,7 +7,20 @@ from structure.models import Section
 User = get_user_model()
 
 
-class DailyStudentAttendance(BaseModel):
+class AttendanceCounts(models.Model):
+    """
+    Counters of student attendance items rolled up over a period.
+    """
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    leave = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyStudentAttendance(BaseModel, AttendanceCounts):
     section = models.ForeignKey(
         Section, on_delete=models.SET_NULL, null=True,
         related_name='student_attendances'
@@ -21,6 +35,15 @@ class DailyStudentAttendance(BaseModel):
         Session, on_delete=models.CASCADE, related_name='student_attendances'
     )
 
+    class Meta:
+        # One attendance per section per day, also serves listing a section by date
+        constraints = [
+            models.UniqueConstraint(
+                fields=['section', 'date'], condition=Q(is_active=True),
+                name='attendance_unique_section_date'
+            ),
+        ]
+
 
 class DailyStaffAttendance(BaseModel):
     date = models.DateField()
@@ -84,3 +107,40 @@ class StaffAttendanceItem(BaseModel):
         User, on_delete=models.CASCADE, related_name='submitted_staff_attendances'
     )
     date = models.DateField()
+
+
+class MonthlySectionAttendance(BaseModel, AttendanceCounts):
+    """
+    Attendance of a section in a month, only includes days on which attendance was taken.
+    Grade figures are the sum of its sections.
+    """
+    section = models.ForeignKey(
+        Section, on_delete=models.CASCADE, related_name='monthly_attendances'
+    )
+    session = models.ForeignKey(
+        Session, on_delete=models.CASCADE, related_name='monthly_section_attendances'
+    )
+    month = models.DateField()
+
+    class Meta:
+        unique_together = ['section', 'session', 'month']
+
+
+class MonthlyStudentAttendance(BaseModel, AttendanceCounts):
+    """
+    Attendance of a student in a section in a month, only includes days on which
+    attendance was taken.
+    """
+    student = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='monthly_attendances'
+    )
+    section = models.ForeignKey(
+        Section, on_delete=models.CASCADE, related_name='monthly_student_attendances'
+    )
+    session = models.ForeignKey(
+        Session, on_delete=models.CASCADE, related_name='monthly_student_attendances'
+    )
+    month = models.DateField()
+
+    class Meta:
+        unique_together = ['student', 'section', 'session', 'month']
@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from attendance import models
 from accounts.serializers import StudentSerializer
@@ -27,11 +28,6 @@ class DailyStudentAttendanceSerializer(serializers.ModelSerializer):
             'fullname': instance.created_by.profile.fullname,
         }
 
-    def validate_date(self, date):
-        if models.DailyStudentAttendance.objects.filter(date=date, section_id=self.initial_data['section_id']).exists():
-            raise serializers.ValidationError('Attendance already exists for given date.')
-        return date
-
     def validate_created_by(self, user):
         try:
             if self.context['request'].user.id == user.id:
@@ -42,12 +38,23 @@ class DailyStudentAttendanceSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Invalid user id')
 
     def create(self, validated_data):
-        instance = models.DailyStudentAttendance.objects.create(**validated_data)
         # Create attendance items for each student in section
         student_ids = models.User.objects.filter(
-            is_active=True, profile__student_info__section_id=instance.section_id
+            is_active=True, profile__student_info__section_id=validated_data['section'].id
             ).values_list('id', flat=True)
         student_ids = [id for id in student_ids]
+        try:
+            with transaction.atomic():
+                instance = models.DailyStudentAttendance.objects.create(
+                    total=len(student_ids), **validated_data
+                )
+        except IntegrityError:
+            # Only one active attendance of a section per day, see DailyStudentAttendance.Meta
+            if models.DailyStudentAttendance.objects.filter(
+                is_active=True, date=validated_data['date'], section=validated_data['section']
+            ).exists():
+                raise serializers.ValidationError({'date': ['Attendance already exists for given date.']})
+            raise
         items = []
         for id in student_ids:
             item = models.StudentAttendanceItem(
@@ -0,0 +1,193 @@
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+
+from attendance import models
+
+
+class AttendanceRollupService:
+    '''
+    Service for maintaining attendance rollups.
+    Daily counts are stored on DailyStudentAttendance while monthly counts are stored per
+    section and per student, so that reports do not have to scan every attendance item.
+    '''
+    COUNTERS = ('present', 'absent', 'leave', 'total')
+    STATUS_COUNTERS = {
+        models.StudentAttendanceItem.PRESENT: 'present',
+        models.StudentAttendanceItem.ABSENT: 'absent',
+        models.StudentAttendanceItem.LEAVE: 'leave',
+    }
+
+    @staticmethod
+    def get_counts(statuses):
+        """
+        Returns counters for the given statuses.
+        
+        Parameters:
+            statuses ([int]): Statuses of attendance items, None if not marked
+        
+        Returns:
+            dict: Value against each counter
+        """
+        counts = {counter: 0 for counter in AttendanceRollupService.COUNTERS}
+        for status in statuses:
+            counter = AttendanceRollupService.STATUS_COUNTERS.get(status, None)
+            if counter:
+                counts[counter] += 1
+            counts['total'] += 1
+        return counts
+
+    @staticmethod
+    def get_contributions(attendance, items):
+        """
+        Returns statuses of the given items counted towards monthly rollups.
+        Items of an attendance contribute only once attendance has been taken.
+        
+        Parameters:
+            attendance (Model): Daily student attendance
+            items ([Model]): Attendance items of the daily student attendance
+        
+        Returns:
+            dict: Status against each student id
+        """
+        if attendance.average_attendance is None:
+            return {}
+        return {item.student_id: item.status for item in items}
+
+    @staticmethod
+    def update_rollups(attendance, previous_contributions, items):
+        """
+        Updates daily counts of the attendance in place and applies the change in its
+        contributions to monthly rollups. Should be called after items and average
+        attendance are updated, the caller is responsible for saving the attendance.
+        
+        Parameters:
+            attendance (Model): Daily student attendance
+            previous_contributions (dict): Result of get_contributions before the update
+            items ([Model]): Updated attendance items of the daily student attendance
+        """
+        for counter, value in AttendanceRollupService.get_counts(
+                [item.status for item in items]).items():
+            setattr(attendance, counter, value)
+
+        contributions = AttendanceRollupService.get_contributions(attendance, items)
+        deltas = {}
+        for student_id in set(previous_contributions) | set(contributions):
+            previous = AttendanceRollupService.get_counts(
+                [previous_contributions[student_id]] if student_id in previous_contributions else []
+            )
+            current = AttendanceRollupService.get_counts(
+                [contributions[student_id]] if student_id in contributions else []
+            )
+            delta = {
+                counter: current[counter] - previous[counter]
+                for counter in AttendanceRollupService.COUNTERS
+            }
+            if any(delta.values()):
+                deltas[student_id] = delta
+        if not deltas:
+            return
+
+        month = attendance.date.replace(day=1)
+        keys = {
+            'section_id': attendance.section_id,
+            'session_id': attendance.session_id,
+            'month': month,
+        }
+        section_delta = {
+            counter: sum(delta[counter] for delta in deltas.values())
+            for counter in AttendanceRollupService.COUNTERS
+        }
+        with transaction.atomic():
+            models.MonthlySectionAttendance.objects.bulk_create(
+                [models.MonthlySectionAttendance(**keys)], ignore_conflicts=True
+            )
+            models.MonthlySectionAttendance.objects.filter(**keys).update(**{
+                counter: F(counter) + value for counter, value in section_delta.items()
+            })
+
+            models.MonthlyStudentAttendance.objects.bulk_create([
+                models.MonthlyStudentAttendance(student_id=student_id, **keys)
+                for student_id in deltas
+            ], ignore_conflicts=True)
+            student_rollups = models.MonthlyStudentAttendance.objects.select_for_update().filter(
+                student_id__in=deltas.keys(), **keys
+            )
+            student_rollups = [rollup for rollup in student_rollups]
+            for rollup in student_rollups:
+                for counter, value in deltas[rollup.student_id].items():
+                    setattr(rollup, counter, getattr(rollup, counter) + value)
+            models.MonthlyStudentAttendance.objects.bulk_update(
+                student_rollups, AttendanceRollupService.COUNTERS
+            )
+
+    @staticmethod
+    def rebuild(session=None, batch_size=1000):
+        """
+        Recomputes all rollups from attendance items.
+        
+        Parameters:
+            session (Model): Optionally rebuild rollups of the given session only
+            batch_size (int): Number of rows written per query
+        
+        Returns:
+            (int, int, int): Number of daily attendances, monthly section and monthly student rollups
+        """
+        attendances = models.DailyStudentAttendance.objects.filter(is_active=True)
+        items = models.StudentAttendanceItem.objects.filter(
+            is_active=True, attendance__is_active=True
+        )
+        section_rollups = models.MonthlySectionAttendance.objects.all()
+        student_rollups = models.MonthlyStudentAttendance.objects.all()
+        if session is not None:
+            attendances = attendances.filter(session=session)
+            items = items.filter(attendance__session=session)
+            section_rollups = section_rollups.filter(session=session)
+            student_rollups = student_rollups.filter(session=session)
+
+        counters = {
+            counter: Count('id', filter=Q(status=status))
+            for status, counter in AttendanceRollupService.STATUS_COUNTERS.items()
+        }
+        counters['total'] = Count('id')
+
+        with transaction.atomic():
+            daily_counts = items.values('attendance_id').annotate(**counters).order_by()
+            daily_counts = {row['attendance_id']: row for row in daily_counts}
+            daily_rollups = []
+            for attendance in attendances.only('id'):
+                counts = daily_counts.get(attendance.id, {})
+                for counter in AttendanceRollupService.COUNTERS:
+                    setattr(attendance, counter, counts.get(counter, 0))
+                daily_rollups.append(attendance)
+            models.DailyStudentAttendance.objects.bulk_update(
+                daily_rollups, AttendanceRollupService.COUNTERS, batch_size=batch_size
+            )
+
+            taken_items = items.filter(
+                attendance__average_attendance__isnull=False
+            ).annotate(
+                month=TruncMonth('attendance__date'),
+                section_id=F('attendance__section_id'),
+                session_id=F('attendance__session_id'),
+            )
+
+            section_rollups.delete()
+            rows = taken_items.values('section_id', 'session_id', 'month').annotate(
+                **counters
+            ).order_by()
+            created_sections = models.MonthlySectionAttendance.objects.bulk_create([
+                models.MonthlySectionAttendance(**row) for row in rows
+                if row['section_id'] is not None
+            ], batch_size=batch_size)
+
+            student_rollups.delete()
+            rows = taken_items.values('student_id', 'section_id', 'session_id', 'month').annotate(
+                **counters
+            ).order_by()
+            created_students = models.MonthlyStudentAttendance.objects.bulk_create([
+                models.MonthlyStudentAttendance(**row) for row in rows
+                if row['section_id'] is not None
+            ], batch_size=batch_size)
+
+        return len(daily_rollups), len(created_sections), len(created_students)
@@ -0,0 +1,115 @@
+from django.db.models import Sum
+
+from attendance import models
+from common.references import get_current_session
+
+
+class AttendanceStatisticsService:
+    '''
+    Service for computing student attendance statistics of a session.
+    Figures are aggregated from monthly section rollups in the database, the number
+    of queries does not depend on the number of grades, sections or days in the session.
+    '''
+
+    @staticmethod
+    def get_current_session():
+        return get_current_session()
+
+    @staticmethod
+    def get_queryset(session, grade_id=None, section_id=None):
+        """
+        Returns monthly section rollups of the given session.
+        
+        Parameters:
+            session (Model): Session for which to compute statistics
+            grade_id (int): Optionally restrict rollups to a grade
+            section_id (int): Optionally restrict rollups to a section
+        
+        Returns:
+            QuerySet: Monthly section attendances
+        """
+        queryset = models.MonthlySectionAttendance.objects.filter(
+            is_active=True, session=session,
+        )
+        if grade_id is not None:
+            queryset = queryset.filter(section__grade_id=grade_id)
+        if section_id is not None:
+            queryset = queryset.filter(section_id=section_id)
+        return queryset
+
+    @staticmethod
+    def get_monthly_attendance(session, **filters):
+        """
+        Returns average attendance of the session as a whole and for each of its months.
+        
+        Parameters:
+            session (Model): Session for which to compute statistics
+            filters: grade_id and/or section_id to restrict rollups
+        
+        Returns:
+            (float, [dict]): Session average and a list of dict containing month and value
+        """
+        if session is None:
+            return 0, []
+        rows = AttendanceStatisticsService.get_queryset(session, **filters).values(
+            'month'
+        ).annotate(
+            present_sum=Sum('present'), total_sum=Sum('total'),
+        ).order_by('month')
+
+        present, total = 0, 0
+        monthly_attendance = []
+        for row in rows:
+            present += row['present_sum']
+            total += row['total_sum']
+            monthly_attendance.append({
+                'month': row['month'].strftime('%B'),
+                'value': AttendanceStatisticsService.get_percentage(row['present_sum'], row['total_sum']),
+            })
+        return AttendanceStatisticsService.get_percentage(present, total), monthly_attendance
+
+    @staticmethod
+    def get_attendance_summary(session, field, **filters):
+        """
+        Returns average attendance of the session grouped by the given field along with
+        the session and monthly averages of get_monthly_attendance, read by a single query.
+        
+        Parameters:
+            session (Model): Session for which to compute statistics
+            field (str): Lookup to group by, e.g. 'section_id'
+            filters: grade_id and/or section_id to restrict rollups
+        
+        Returns:
+            (dict, float, [dict]): Average attendance percentage against each value of field,
+                session average and a list of dict containing month and value
+        """
+        if session is None:
+            return {}, 0, []
+        rows = AttendanceStatisticsService.get_queryset(session, **filters).values(
+            field, 'month'
+        ).annotate(
+            present_sum=Sum('present'), total_sum=Sum('total'),
+        ).order_by('month')
+
+        groups, months = {}, {}
+        for row in rows:
+            for totals in (groups.setdefault(row[field], [0, 0]), months.setdefault(row['month'], [0, 0])):
+                totals[0] += row['present_sum']
+                totals[1] += row['total_sum']
+
+        get_percentage = AttendanceStatisticsService.get_percentage
+        monthly_attendance = [
+            {'month': month.strftime('%B'), 'value': get_percentage(present, total)}
+            for month, (present, total) in months.items()
+        ]
+        attendance = get_percentage(
+            sum(present for present, total in months.values()),
+            sum(total for present, total in months.values()),
+        )
+        return {
+            value: get_percentage(present, total) for value, (present, total) in groups.items()
+        }, attendance, monthly_attendance
+
+    @staticmethod
+    def get_percentage(present, total):
+        return round(present / total * 100.0, 1) if total > 0 else 0
@@ -2,18 +2,18 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework.mixins import (
     CreateModelMixin, ListModelMixin, RetrieveModelMixin, UpdateModelMixin
 )
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 from functools import reduce
 from attendance import serializers
 from attendance import models
+from attendance.services.rollups import AttendanceRollupService
+from common.exports import submit_export
+from common.pagination import paginate
 from common.permissions import IsAdmin
-import os
-import datetime
-import csv
-from django.conf import LazySettings
-settings = LazySettings()
+from common.references import get_current_session
 
 
 
@@ -27,21 +27,13 @@ class DailyStudentAttendanceViewSet(
 
     def list(self, request, *args, **kwargs):
         params = request.query_params
-        queryset = self.get_filtered_queryset(**params)
-        paginator = Paginator(queryset, 30)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-        results = {}
-        results['data'] = self.serializer_class(page, many=True).data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        queryset = self.get_filtered_queryset(params)
+        results = paginate(queryset, params, 30, self.serializer_class, ordering='-date')
         return Response(status=status.HTTP_200_OK, data=results)
 
     def create(self, request, *args, **kwargs):
         data = request.data
-        current_session = models.Session.objects.filter(is_active=True).first()
+        current_session = get_current_session()
         if not current_session:
             return Response(status=status.HTTP_400_BAD_REQUEST, data={
                 'message': 'No active session found',
@@ -56,7 +48,7 @@ class DailyStudentAttendanceViewSet(
         instance = self.get_object()
         params = request.query_params
         if 'download' in params and params['download'] == 'true':
-            return self.get_downloadable_link(instance)
+            return self.get_downloadable_link(instance, params, request.user)
         serializer = serializers.DailyStudentAttendanceDetailsSerializer(
             instance=instance
         )
@@ -69,22 +61,34 @@ class DailyStudentAttendanceViewSet(
         data = request.data
         instance = self.get_object()
         if 'items' in data:
-            items = instance.items.all()
-            items = {i.id: i for i in items}
-            for item in data['items']:
-                matched_item = items.get(item['id'], None)
-                if matched_item is None:
-                    continue
-                matched_item.status = item['status']
-                if 'comments' in item:
-                    matched_item.comments = item['comments']
-            items = items.values()
-            if len(items) > 0:
-                models.StudentAttendanceItem.objects.bulk_update(
-                    items, ['status', 'comments']
+            with transaction.atomic():
+                # Locked before items are read so concurrent updates apply the change in
+                # contributions to rollups one after another
+                instance = models.DailyStudentAttendance.objects.select_for_update().get(id=instance.id)
+                items = instance.items.all()
+                items = {i.id: i for i in items}
+                previous_contributions = AttendanceRollupService.get_contributions(
+                    instance, items.values()
                 )
-                instance.average_attendance = self.get_average_attendance(items)
-                instance.save()
+                now = timezone.now()
+                for item in data['items']:
+                    matched_item = items.get(item['id'], None)
+                    if matched_item is None:
+                        continue
+                    matched_item.status = item['status']
+                    matched_item.updated_at = now
+                    if 'comments' in item:
+                        matched_item.comments = item['comments']
+                items = items.values()
+                if len(items) > 0:
+                    models.StudentAttendanceItem.objects.bulk_update(
+                        items, ['status', 'comments', 'updated_at']
+                    )
+                    instance.average_attendance = self.get_average_attendance(items)
+                    AttendanceRollupService.update_rollups(
+                        instance, previous_contributions, items
+                    )
+                    instance.save()
         return Response(status=status.HTTP_200_OK)
 
     @staticmethod
@@ -107,22 +111,10 @@ class DailyStudentAttendanceViewSet(
         return queryset.order_by('-date')
 
     @staticmethod
-    def get_downloadable_link(instance):
-        instance = models.DailyStudentAttendance.objects.filter(id=instance.id).prefetch_related(
-            'items__student__profile__student_info').first()
-        timestamp = datetime.datetime.now().strftime("%f")
-        date = instance.date.strftime('%Y_%m_%d')
-        grade = instance.section.grade
-        section = instance.section.name
-        file_name = f'{grade}_{section}_attendance_{date}_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([
-                'GR Number', 'Full Name', 'Status', 'Comments'
-            ])
-            for attendance_item in instance.items.all():
-                writer.writerow(DailyStudentAttendanceViewSet.get_csv_row(attendance_item))
-        return Response(file_name, status=status.HTTP_200_OK)
+    def get_downloadable_link(instance, params, user):
+        params = params.dict()
+        params['attendance_id'] = instance.id
+        return submit_export('attendance.exports.get_attendance_export', params, user)
 
     @staticmethod
     def get_csv_row(item):
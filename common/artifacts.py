@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, QuerySet, Sum
+from django.utils import timezone
+
+from common.models import Artifact
+
+IGNORED_PARAMS = ('download', 'stream')
+
+
+def get_path(file_name):
+    directory = os.path.join(settings.BASE_DIR, 'downloadables')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, file_name)
+
+
+def new_file_name(name):
+    """
+    Returns a unique file name, with the extension of given name, for storing an artifact.
+    """
+    return f'{uuid.uuid4().hex}{os.path.splitext(name)[1]}'
+
+
+def save_artifact(name, file_name, key=None, version=None):
+    """
+    Records a file written to the path of file_name as an artifact.
+    
+    Parameters:
+        name (str): Name of the file presented on download
+        file_name (str): Name returned by new_file_name
+        key (str): Result of get_key, if the artifact may be reused
+        version (str): Result of get_version, if the artifact may be reused
+    
+    Returns:
+        Model: An instance of created artifact
+    """
+    return Artifact.objects.create(
+        name=name, file_name=file_name, key=key, version=version,
+        size=os.path.getsize(get_path(file_name)),
+    )
+
+
+def get_key(name, params):
+    """
+    Returns a hash identifying an export and its filters.
+    """
+    params = {key: value for key, value in params.items() if key not in IGNORED_PARAMS}
+    value = json.dumps({'name': name, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def get_version(items):
+    """
+    Returns a hash identifying the state of exported items, computed with a single
+    aggregate query over the number of items and the last update of items and of
+    rows selected along with them. Returns None for items which are not a queryset.
+    """
+    if not isinstance(items, QuerySet):
+        return None
+    aggregates = {'count': Count('pk')}
+    paths = [''] + get_related_paths(items.model, items.query.select_related)
+    paths += get_value_paths(items.query.values_select)
+    for path in paths:
+        model = get_model(items.model, path)
+        if any(field.name == 'updated_at' for field in model._meta.get_fields()):
+            lookup = f'{path}__updated_at' if path else 'updated_at'
+            aggregates[lookup] = Max(lookup)
+    values = items.order_by().aggregate(**aggregates)
+    value = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def get_related_paths(model, select_related, prefix=''):
+    paths = []
+    if not isinstance(select_related, dict):
+        return paths
+    for name, nested in select_related.items():
+        path = f'{prefix}__{name}' if prefix else name
+        paths.append(path)
+        related_model = model._meta.get_field(name).related_model
+        paths += get_related_paths(related_model, nested, path)
+    return paths
+
+
+def get_value_paths(values_select):
+    """
+    Returns paths of relations spanned by lookups of a values() queryset, e.g.
+    student and student__profile for student__profile__fullname.
+    """
+    paths = []
+    for lookup in values_select:
+        names = lookup.split('__')[:-1]
+        for index in range(1, len(names) + 1):
+            path = '__'.join(names[:index])
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def get_model(model, path):
+    for name in path.split('__') if path else []:
+        model = model._meta.get_field(name).related_model
+    return model
+
+
+def find_artifact(key, version):
+    """
+    Returns an artifact generated for the given key and version whose file still exists.
+    """
+    if key is None or version is None:
+        return None
+    artifact = Artifact.objects.filter(
+        key=key, version=version, is_active=True
+    ).order_by('-created_at').first()
+    if artifact is None:
+        return None
+    if not os.path.exists(get_path(artifact.file_name)):
+        artifact.delete()
+        return None
+    return artifact
+
+
+def touch(artifact):
+    Artifact.objects.filter(id=artifact.id).update(last_accessed_at=timezone.now())
+
+
+def sweep(ttl=None, max_size=None):
+    """
+    Deletes artifacts not accessed within ttl seconds, then least recently accessed
+    artifacts until their total size is within max_size bytes. Files in downloadables
+    which are not tracked as artifacts are deleted once older than ttl.
+    
+    Returns:
+        int: Number of deleted files
+    """
+    ttl = ttl if ttl is not None else settings.ARTIFACT_TTL
+    max_size = max_size if max_size is not None else settings.ARTIFACT_MAX_SIZE
+    expiry = timezone.now() - timedelta(seconds=ttl)
+
+    evicted = list(Artifact.objects.filter(last_accessed_at__lt=expiry))
+    remaining = Artifact.objects.filter(last_accessed_at__gte=expiry)
+    total_size = remaining.aggregate(total=Sum('size'))['total'] or 0
+    if total_size > max_size:
+        for artifact in remaining.order_by('last_accessed_at'):
+            if total_size <= max_size:
+                break
+            evicted.append(artifact)
+            total_size -= artifact.size
+
+    deleted = 0
+    for artifact in evicted:
+        path = get_path(artifact.file_name)
+        if os.path.exists(path):
+            os.remove(path)
+            deleted += 1
+    Artifact.objects.filter(id__in=[artifact.id for artifact in evicted]).delete()
+
+    tracked = set(Artifact.objects.values_list('file_name', flat=True))
+    directory = os.path.dirname(get_path('_'))
+    for file_name in os.listdir(directory):
+        path = os.path.join(directory, file_name)
+        if file_name in tracked or not os.path.isfile(path):
+            continue
+        if os.path.getmtime(path) < expiry.timestamp():
+            os.remove(path)
+            deleted += 1
+    return deleted
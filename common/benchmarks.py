@@ -0,0 +1,81 @@
+import re
+import statistics
+
+from django.db import connections
+
+from common.pagination import encode_cursor, get_keyset_queryset
+
+EXECUTION_TIME_PATTERN = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+def explain(queryset, runs=5, count=False):
+    """
+    Runs the query of the queryset under EXPLAIN ANALYZE, PostgreSQL only.
+
+    Parameters:
+        queryset (QuerySet): Query to measure, sliced like the endpoint slices it
+        runs (int): Number of times the query is run
+        count (bool): Whether to measure counting rows of the queryset instead
+
+    Returns:
+        (float, [str]): Median execution time in milliseconds and plan of the last run
+    """
+    if count:
+        queryset = queryset.order_by().values('pk')
+    sql, params = queryset.query.sql_with_params()
+    if count:
+        sql = f'SELECT COUNT(*) FROM ({sql}) subquery'
+    times = []
+    with connections[queryset.db].cursor() as cursor:
+        for _ in range(runs):
+            cursor.execute(f'EXPLAIN ANALYZE {sql}', params)
+            plan = [row[0] for row in cursor.fetchall()]
+            times.append(float(EXECUTION_TIME_PATTERN.search(plan[-1]).group(1)))
+    return statistics.median(times), plan
+
+
+def analyze(*models):
+    """
+    Vacuums and analyzes tables of the models right after seeding them, leaving statistics and
+    visibility maps as autovacuum would later, so plans do not change between runs.
+    Runs outside a transaction, VACUUM cannot run in one.
+    """
+    with connections['default'].cursor() as cursor:
+        for model in models:
+            cursor.execute(f'VACUUM ANALYZE {model._meta.db_table}')
+
+
+def get_scans(plan):
+    """
+    Returns scan nodes of a plan, e.g. Index Scan using ... on ..., in plan order.
+    """
+    return [line.strip().lstrip('-> ').split('  (')[0] for line in plan if ' Scan ' in line]
+
+
+def get_keyset_page_queryset(queryset, page, page_size, ordering):
+    """
+    Returns the query paginate runs for the given page when it is reached by cursors.
+    """
+    cursor = ''
+    if page > 1:
+        field = ordering.lstrip('-')
+        ordered = get_keyset_queryset(queryset, '', ordering).values(field, 'id')
+        row = ordered[(page - 1) * page_size - 1]
+        cursor = encode_cursor(row[field], row['id'])
+    return get_keyset_queryset(queryset, cursor, ordering)[:page_size + 1]
+
+
+def run_cases(command, cases, runs):
+    """
+    Writes median execution time and scans of each case to the output of a management command.
+
+    Parameters:
+        command (BaseCommand): Command writing the results
+        cases ([tuple]): Name, queryset and whether to measure its count
+        runs (int): Number of times each query is run
+    """
+    for name, queryset, count in cases:
+        # Measured on a new connection like a request, backends warmed by seeding run faster
+        connections[queryset.db].close()
+        time, plan = explain(queryset, runs, count)
+        command.stdout.write(f'{name:44s} {time:9.3f} ms  {"; ".join(get_scans(plan)[:3])}')
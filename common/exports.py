@@ -0,0 +1,122 @@
+import csv
+import datetime
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+
+from common import artifacts
+from common.jobs import report_progress, submit_job
+from common.serializers import JobSerializer
+
+PROGRESS_INTERVAL = 500
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    File-like object returning written values, used to get CSV rows as strings.
+    """
+
+    def write(self, value):
+        return value
+
+
+def submit_export(export, params, user):
+    """
+    Exports rows described by the given export function.
+    
+    Parameters:
+        export (str): Dotted path of a function which receives params as kwargs and returns
+            file name, header ([str]), items (QuerySet|list) and a function returning CSV row of an item
+        params (dict): JSON serializable keyword arguments of the export function
+        user (Model): User requesting the export
+    
+    Returns:
+        Response: Rows streamed as CSV if stream param is true. Otherwise the export is
+        written to a file by a background job and the job is returned right away, its
+        status and generated file can be polled through the job status endpoint. The job
+        reuses the file generated for the same params if exported data has not changed since.
+    """
+    if params.get('stream', None) == 'true':
+        return stream_export(export, params)
+    job = submit_job('common.exports.run_export', {'export': export, 'params': params}, user)
+    return Response(status=status.HTTP_202_ACCEPTED, data=JobSerializer(job).data)
+
+
+def run_export(job, export, params):
+    file_name, header, items, get_row = import_string(export)(**params)
+    key = artifacts.get_key(export, params)
+    version = artifacts.get_version(items)
+    artifact = artifacts.find_artifact(key, version)
+    if artifact is not None:
+        return artifact.file_name
+    return write_csv(job, file_name, header, items, get_row, key, version)
+
+
+def stream_export(export, params):
+    """
+    Returns a response streaming rows of the export as they are produced,
+    querysets are read in chunks so memory stays flat regardless of their size.
+    """
+    file_name, header, items, get_row = import_string(export)(**params)
+    writer = csv.writer(Echo(), delimiter=',')
+
+    def rows():
+        yield writer.writerow(header)
+        for item in iterate(items):
+            yield writer.writerow(get_row(item))
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
+
+
+def iterate(items):
+    if isinstance(items, QuerySet):
+        return items.iterator(chunk_size=CHUNK_SIZE)
+    return items
+
+
+def get_file_name(prefix):
+    timestamp = datetime.datetime.now().strftime("%Y_%m_%d")
+    return f'{prefix}_{timestamp}.csv'
+
+
+def get_total(items):
+    if isinstance(items, QuerySet):
+        return items.count()
+    if isinstance(items, (list, tuple)):
+        return len(items)
+    return 0
+
+
+def write_csv(job, name, header, items, get_row, key=None, version=None):
+    """
+    Writes a CSV file to the artifact store while reporting progress of the job.
+    
+    Parameters:
+        job (Model): Job running the export
+        name (str): Name of the file presented on download
+        header ([str]): Header row
+        items (QuerySet|list|iterable): Items to write
+        get_row (function): Returns CSV row of an item
+        key (str): Hash of the export and its params
+        version (str): Hash of the exported data
+    
+    Returns:
+        str: Name of the written file in the artifact store
+    """
+    report_progress(job, 0, get_total(items))
+    file_name = artifacts.new_file_name(name)
+    with open(artifacts.get_path(file_name), mode='w', newline='') as file:
+        writer = csv.writer(file, delimiter=',')
+        writer.writerow(header)
+        for index, item in enumerate(iterate(items), 1):
+            writer.writerow(get_row(item))
+            if index % PROGRESS_INTERVAL == 0:
+                report_progress(job, index)
+    artifacts.save_artifact(name, file_name, key, version)
+    return file_name
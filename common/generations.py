@@ -0,0 +1,66 @@
+import re
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_CACHE_KEY = 'table_generation_{0}'
+WRITE_PATTERN = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+[`"]?(\w+)', re.IGNORECASE)
+TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+[`"]?(\w+)', re.IGNORECASE)
+
+recording = threading.local()
+
+
+def get_generations(tables):
+    """
+    Returns generation counters of given tables, a counter changes whenever rows of its table are written.
+    """
+    keys = {table: GENERATION_CACHE_KEY.format(table) for table in tables}
+    values = cache.get_many(keys.values())
+    generations = {}
+    for table, key in sorted(keys.items()):
+        if key not in values:
+            # Counters start from the current time so an evicted counter is never reused
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+        generations[table] = values[key]
+    return generations
+
+
+def get_tables(sql):
+    return set(TABLE_PATTERN.findall(sql))
+
+
+def bump_generation(table):
+    if getattr(recording, 'active', False):  # Cache backends may write to the database themselves
+        return
+    key = GENERATION_CACHE_KEY.format(table)
+    recording.active = True
+    try:
+        cache.incr(key)
+    except ValueError:  # Counter is not set
+        cache.set(key, time.time_ns(), None)
+    finally:
+        recording.active = False
+
+
+def record_writes(execute, sql, params, many, context):
+    """
+    Database execute wrapper bumping generation of the table written by a query, again
+    once the transaction commits so counts read before the commit are discarded as well.
+    """
+    result = execute(sql, params, many, context)
+    match = WRITE_PATTERN.match(sql)
+    if match is not None:
+        table = match.group(1)
+        connection = context['connection']
+        bump_generation(table)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: bump_generation(table), using=connection.alias)
+    return result
+
+
+def install_write_recorder(connection):
+    if record_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_writes)
@@ -0,0 +1,100 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from common.models import Job
+
+logger = logging.getLogger(__name__)
+
+_local_executor = None
+
+
+def submit_job(name, params, user=None):
+    """
+    Creates a job and dispatches it to the configured executor.
+    
+    Parameters:
+        name (str): Dotted path of the function to run, called with the job and params as kwargs
+        params (dict): JSON serializable keyword arguments of the function
+        user (Model): User who submitted the job
+    
+    Returns:
+        Model: An instance of created job
+    """
+    job = Job.objects.create(
+        name=name, params=json.dumps(params),
+        created_by=user if user and user.is_authenticated else None
+    )
+    executor = getattr(settings, 'JOB_EXECUTOR', 'local')
+    if executor == 'inline':  # Runs in the request thread, meant for development and tests
+        run_job(job.id)
+        job.refresh_from_db()
+    elif executor == 'local':  # Runs in a pool of threads of the current process
+        transaction.on_commit(lambda: get_local_executor().submit(run_local_job, job.id))
+    else:
+        transaction.on_commit(lambda: dispatch_celery_job(job.id))
+    return job
+
+
+def dispatch_celery_job(job_id):
+    from common.tasks import run_job_task
+    try:
+        run_job_task.delay(job_id)
+    except Exception as e:  # E.g. unreachable broker, the job would otherwise stay pending
+        logger.exception('Job %s could not be dispatched', job_id)
+        Job.objects.filter(id=job_id).update(status=Job.FAILED, error=str(e)[:512])
+
+
+def get_local_executor():
+    global _local_executor
+    if _local_executor is None:
+        _local_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'JOB_WORKERS', 2)
+        )
+    return _local_executor
+
+
+def run_local_job(job_id):
+    try:
+        run_job(job_id)
+    finally:  # Threads of the pool do not go through request cleanup
+        connection.close()
+
+
+def run_job(job_id):
+    """
+    Runs the job with given id and records its outcome.
+    The job function returns the name of the generated file, if any.
+    """
+    job = Job.objects.get(id=job_id)
+    job.status = Job.RUNNING
+    job.save()
+    try:
+        func = import_string(job.name)
+        file_name = func(job, **json.loads(job.params))
+    except Exception as e:
+        logger.exception('Job %s failed', job.id)
+        job.status = Job.FAILED
+        job.error = str(e)[:512]
+    else:
+        job.refresh_from_db(fields=['progress', 'total'])
+        job.status = Job.COMPLETED
+        job.file_name = file_name
+        job.progress = job.total
+    job.save()
+
+
+def report_progress(job, progress, total=None):
+    """
+    Records progress of a running job without touching its other fields.
+    """
+    job.progress = progress
+    fields = {'progress': progress}
+    if total is not None:
+        job.total = total
+        fields['total'] = total
+    Job.objects.filter(id=job.id).update(**fields)
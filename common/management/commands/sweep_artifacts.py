@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from common import artifacts
+
+
+class Command(BaseCommand):
+    """
+    Evicts generated files from downloadables
+    """
+    help = "Deletes expired artifacts and least recently used ones over the size limit"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ttl', type=int, default=None,
+            help='Seconds since last access after which a file is deleted, ARTIFACT_TTL if omitted')
+        parser.add_argument(
+            '--max-size', type=int, default=None,
+            help='Total size in bytes kept in downloadables, ARTIFACT_MAX_SIZE if omitted')
+
+    def handle(self, *args, **options):
+        deleted = artifacts.sweep(ttl=options['ttl'], max_size=options['max_size'])
+        self.stdout.write(f'Deleted {deleted} files.')
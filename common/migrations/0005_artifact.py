@@ -0,0 +1,31 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artifact',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('name', models.CharField(max_length=256)),
+                ('file_name', models.CharField(max_length=64, unique=True)),
+                ('key', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('version', models.CharField(blank=True, max_length=64, null=True)),
+                ('size', models.IntegerField(default=0)),
+                ('last_accessed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
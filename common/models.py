@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 
@@ -23,3 +24,47 @@ class Session(BaseModel):
     name = models.CharField(max_length=50)
     start_date = models.DateField()
     end_date = models.DateField()
+
+
+class Job(BaseModel):
+    """
+    Background job, e.g. generation of a downloadable report.
+    Name is the dotted path of the function run by the job.
+    """
+    PENDING = 1
+    RUNNING = 2
+    COMPLETED = 3
+    FAILED = 4
+
+    StatusChoices = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=128)
+    params = models.TextField(max_length=2048, default='{}')
+    status = models.IntegerField(choices=StatusChoices, default=PENDING)
+    progress = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    file_name = models.CharField(max_length=256, null=True, blank=True)
+    error = models.TextField(max_length=512, null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
+        related_name='jobs'
+    )
+
+
+class Artifact(BaseModel):
+    """
+    Generated file stored in downloadables under a unique file name.
+    Key identifies the export and its filters, version identifies the exported data,
+    an artifact with same key and version is reused instead of being generated again.
+    """
+    name = models.CharField(max_length=256)
+    file_name = models.CharField(max_length=64, unique=True)
+    key = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    version = models.CharField(max_length=64, null=True, blank=True)
+    size = models.IntegerField(default=0)
+    last_accessed_at = models.DateTimeField(auto_now_add=True)
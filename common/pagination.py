@@ -0,0 +1,139 @@
+import base64
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+
+from common.generations import get_generations, get_tables
+from common.references import is_cache_shared
+
+COUNT_CACHE_KEY = 'count_{0}'
+COUNT_CACHE_TIMEOUT = 60 * 5
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator reading count of its queryset through get_count.
+    """
+
+    @cached_property
+    def count(self):
+        return get_count(self.object_list)
+
+
+def paginate(queryset, params, page_size, serializer_class, ordering='-created_at'):
+    """
+    Returns a page of serialized rows of the queryset.
+
+    Rows are selected by page number when page param is given or cursor param is
+    absent, results then contain data, page and count as before. When cursor param
+    is given, empty for the first page, rows are selected by keyset on ordering and
+    id instead of an offset, so every page costs the same. Results then contain data
+    and the cursor of the next page, None on the last page, and count only if count
+    param is true. Counts are cached, see get_count.
+
+    Parameters:
+        queryset (QuerySet): Rows to paginate
+        params (dict): Query params of the request
+        page_size (int): Number of rows per page
+        serializer_class (class): Serializer of a row
+        ordering (str): Field the keyset is ordered on, prefixed with - for descending order,
+            or None when the queryset keeps its own ordering, e.g. ranked search results,
+            rows are then selected by page number even if cursor param is given
+
+    Returns:
+        dict: Results of the page
+    """
+    results = {}
+    if ordering is not None and 'cursor' in params and 'page' not in params:
+        rows, results['next'] = get_keyset_page(queryset, params['cursor'], page_size, ordering)
+        results['data'] = serializer_class(rows, many=True).data
+        if params.get('count', None) == 'true':
+            results['count'] = get_count(queryset)
+        return results
+
+    paginator = CachedCountPaginator(queryset, page_size)
+    if 'page' in params:
+        page = paginator.page(int(params['page']))
+    else:
+        page = paginator.page(1)
+    results['data'] = serializer_class(page, many=True).data
+    results['page'] = page.number
+    results['count'] = paginator.count
+    return results
+
+
+def get_count(queryset):
+    """
+    Returns number of rows of the queryset. Counts are cached by their SQL, which identifies
+    the endpoint and its filters, along with generations of the tables read by the query,
+    so a count is reused until any of those tables is written.
+
+    Generations are bumped in the cache of the writing process, so counts are only cached
+    when the cache is shared, other workers would otherwise keep serving stale counts.
+    """
+    if not is_cache_shared():
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    generations = get_generations(get_tables(sql))
+    value = json.dumps([sql, params, generations], default=str)
+    key = COUNT_CACHE_KEY.format(hashlib.sha256(value.encode()).hexdigest())
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def get_keyset_page(queryset, cursor, page_size, ordering):
+    field = ordering.lstrip('-')
+    queryset = get_keyset_queryset(queryset, cursor, ordering)
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(get_value(rows[-1], field), get_value(rows[-1], 'id'))
+
+
+def get_keyset_queryset(queryset, cursor, ordering):
+    """
+    Returns rows of the queryset following the cursor, ordered on the keyset.
+    """
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    queryset = queryset.order_by(ordering, '-id' if descending else 'id')
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        operator, bound = ('lt', 'lte') if descending else ('gt', 'gte')
+        # The redundant bound gives the index on field a range to scan, which the
+        # disjunction alone does not
+        queryset = queryset.filter(
+            Q(**{f'{field}__{bound}': value}) &
+            (Q(**{f'{field}__{operator}': value}) | Q(**{field: value, f'id__{operator}': last_id}))
+        )
+    return queryset
+
+
+def get_value(row, field):
+    if isinstance(row, dict):  # Row of a values() queryset
+        return row[field]
+    return getattr(row, field)
+
+
+def encode_cursor(value, id):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return value, int(id)
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': ['Invalid cursor']})
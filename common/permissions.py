@@ -1,45 +1,80 @@
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission
 
 from accounts.models import Profile
+from common.references import is_cache_shared
 
+ROLES_CACHE_KEY = 'user_roles_{0}'
+ROLES_CACHE_TIMEOUT = 60 * 5
 
-class IsAdmin(BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and \
-               request.user.groups.filter(name='Admin').count() > 0
 
+def get_user_roles(user):
+    """
+    Returns the set of group names the given user belongs to.
+    Roles are loaded with a single query, memoized on the user instance for the
+    rest of the request and, when the cache is shared by all workers, cached across
+    requests until group membership changes. A per process cache would keep revoked
+    roles in other workers, so roles are then loaded once per request only.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_cached_roles', None)
+    if roles is not None:
+        return roles
+    shared = is_cache_shared()
+    key = ROLES_CACHE_KEY.format(user.id)
+    roles = cache.get(key) if shared else None
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        if shared:
+            cache.set(key, roles, ROLES_CACHE_TIMEOUT)
+    user._cached_roles = roles
+    return roles
 
-class IsAccountant(BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and \
-               request.user.groups.filter(name='Accountant').count() > 0
 
+def has_role(user, role):
+    return role in get_user_roles(user)
 
-class IsCoordinator(BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and \
-               request.user.groups.filter(name='Coordinator').count() > 0
 
+def clear_user_roles(user_ids):
+    """
+    Evicts cached roles of given users, called whenever their group membership changes.
+    """
+    keys = [ROLES_CACHE_KEY.format(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
 
-class IsTeacher(BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and \
-               request.user.groups.filter(name='Teacher').count() > 0
 
+class RolePermission(BasePermission):
+    role = None
 
-class IsHR(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and \
-               request.user.groups.filter(name='HR').count() > 0
+        return has_role(request.user, self.role)
 
 
-class IsStaff(BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and \
-               request.user.groups.filter(name='Staff').count() > 0
+class IsAdmin(RolePermission):
+    role = 'Admin'
 
 
-class IsStudent(BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and \
-               request.user.groups.filter(name='Student').count() > 0
+class IsAccountant(RolePermission):
+    role = 'Accountant'
+
+
+class IsCoordinator(RolePermission):
+    role = 'Coordinator'
+
+
+class IsTeacher(RolePermission):
+    role = 'Teacher'
+
+
+class IsHR(RolePermission):
+    role = 'HR'
+
+
+class IsStaff(RolePermission):
+    role = 'Staff'
+
+
+class IsStudent(RolePermission):
+    role = 'Student'
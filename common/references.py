@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from common.models import Config, Session
+
+REFERENCE_CACHE_KEY = 'reference_{0}'
+
+# Cache backends keeping values in the memory of each process
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Writes evict references from a per process cache in the writing worker only, other
+# workers keep serving their cached value, e.g. a closed session, for at most this long
+LOCAL_CACHE_TIMEOUT = 60
+
+# Cached references with their timeout in seconds and labels of models whose writes evict them
+REFERENCES = {
+    'current_session': (60 * 60, ['common.Session']),
+    'configs': (60 * 60, ['common.Config']),
+    'default_account_id': (60 * 60, ['finances.Account']),
+    'grades': (60 * 15, ['structure.Grade', 'structure.Section']),
+    'sections': (60 * 15, ['structure.Grade', 'structure.Section']),
+    'subjects': (60 * 15, ['academics.Subject']),
+}
+
+
+def is_cache_shared():
+    """
+    Returns whether the default cache is shared by all workers, so evicting a key
+    in one worker evicts it for the others as well.
+    """
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def get_reference(name, load):
+    """
+    Returns a rarely changing value from the cache, loading and caching it on a miss.
+
+    Parameters:
+        name (str): Key of the reference in REFERENCES
+        load (function): Returns the value when it is not cached
+
+    Returns:
+        object: Cached or loaded value, which may be None
+    """
+    key = REFERENCE_CACHE_KEY.format(name)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached[0]
+    value = load()
+    timeout = REFERENCES[name][0]
+    if not is_cache_shared():
+        timeout = min(timeout, LOCAL_CACHE_TIMEOUT)
+    # Wrapped so a missing value, e.g. no active session, is cached as well
+    cache.set(key, (value,), timeout)
+    return value
+
+
+def evict_references(label):
+    """
+    Evicts references depending on the model with the given label, e.g. common.Session.
+    """
+    keys = [
+        REFERENCE_CACHE_KEY.format(name)
+        for name, (timeout, labels) in REFERENCES.items() if label in labels
+    ]
+    if len(keys) > 0:
+        cache.delete_many(keys)
+
+
+def get_current_session():
+    return get_reference(
+        'current_session', lambda: Session.objects.filter(is_active=True).first()
+    )
+
+
+def get_config(name):
+    configs = get_reference(
+        'configs', lambda: dict(Config.objects.values_list('name', 'value').order_by('-id'))
+    )
+    return configs.get(name, None)
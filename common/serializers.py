@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from common import models
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = models.Job
+        fields = ('id', 'name', 'status', 'progress', 'total', 'file_name',
+                  'error', 'created_at', 'updated_at')
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from common.generations import install_write_recorder
+from common.permissions import clear_user_roles
+from common.references import evict_references
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ['post_add', 'post_remove', 'pre_clear']:
+        return
+    if not reverse:  # Groups of a user changed
+        clear_user_roles([instance.id])
+    elif action == 'pre_clear':  # All users removed from a group
+        clear_user_roles(instance.user_set.values_list('id', flat=True))
+    else:  # Users added to or removed from a group
+        clear_user_roles(pk_set or [])
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:  # Group may have been renamed
+        clear_user_roles(instance.user_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    clear_user_roles(instance.user_set.values_list('id', flat=True))
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_write_recorder(connection)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def model_changed(sender, **kwargs):
+    evict_references(sender._meta.label)
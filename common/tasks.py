@@ -0,0 +1,13 @@
+from celery import shared_task
+
+from common import artifacts, jobs
+
+
+@shared_task
+def run_job_task(job_id):
+    jobs.run_job(job_id)
+
+
+@shared_task
+def sweep_artifacts_task():
+    artifacts.sweep()
@@ -1,3 +1,95 @@
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from common.models import Job
+from common.pagination import get_count, get_keyset_page
+from finances.models import FeeChallan
+
+
+class KeysetPaginationTestCase(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        for index in range(7):
+            job = Job.objects.create(name='export')
+            # Pairs of jobs share created_at so pages break between ties
+            Job.objects.filter(id=job.id).update(created_at=now - datetime.timedelta(minutes=index // 2))
+
+    def get_ids(self, queryset, ordering):
+        ids, cursor = [], ''
+        while cursor is not None:
+            rows, cursor = get_keyset_page(queryset, cursor, 2, ordering)
+            ids.extend(row['id'] for row in rows)
+        return ids
+
+    def test_pages_follow_ordering(self):
+        queryset = Job.objects.values('id', 'created_at')
+        self.assertEqual(
+            self.get_ids(queryset, '-created_at'),
+            list(queryset.order_by('-created_at', '-id').values_list('id', flat=True))
+        )
+        self.assertEqual(
+            self.get_ids(queryset, 'created_at'),
+            list(queryset.order_by('created_at', 'id').values_list('id', flat=True))
+        )
+
+    def test_page_query_bounds_field(self):
+        student = User.objects.create(username='student')
+        for _ in range(5):
+            FeeChallan.objects.create(student=student, total=100, due_date=datetime.date(2019, 4, 10))
+        queryset = FeeChallan.objects.filter(is_active=True).values('id', 'created_at')
+        _, cursor = get_keyset_page(queryset, '', 2, '-created_at')
+        with CaptureQueriesContext(connection) as queries:
+            rows, _ = get_keyset_page(queryset, cursor, 2, '-created_at')
+        self.assertEqual(len(rows), 2)
+
+        # Page 2 reads a range of the index instead of filtering every active challan
+        with connection.cursor() as db_cursor:
+            db_cursor.execute('SET enable_seqscan = off')
+            db_cursor.execute('EXPLAIN ' + queries[0]['sql'])
+            plan = '\n'.join(row[0] for row in db_cursor.fetchall())
+        self.assertIn('finances_fc_active_created', plan)
+        self.assertRegex(plan, r'Index Cond: \(created_at <= ')
+
+
+class CountCacheTestCase(TestCase):
+
+    def setUp(self):
+        for _ in range(2):
+            Job.objects.create(name='export')
+        self.queryset = Job.objects.filter(is_active=True)
+
+    def test_local_cache_counts_every_time(self):
+        # Writes in other workers do not reach a per process cache, so counts are not cached there
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(get_count(self.queryset), 2)
+
+    def test_write_invalidates_shared_count(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            self.assertEqual(get_count(self.queryset), 2)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_count(self.queryset), 2)
+
+            # Written outside the ORM, e.g. by a management command running raw SQL
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO common_job "
+                    "(name, params, status, progress, total, is_active, created_at, updated_at) "
+                    "VALUES ('export', '{}', 1, 0, 0, true, now(), now())"
+                )
+            self.assertEqual(get_count(self.queryset), 3)
+
+            Job.objects.filter(id=Job.objects.first().id).update(is_active=False)
+            self.assertEqual(get_count(self.queryset), 2)
@@ -1,13 +1,40 @@
-from django.http import HttpResponse
+from django.http import FileResponse, Http404
+import mimetypes
 import os
-from django.conf import LazySettings
-settings = LazySettings()
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from common import artifacts, models, serializers
+from common.permissions import has_role
 
 
 def download_csv(request):
-    file_name = request.GET.get('file_name', None)
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-    file = open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'))
-    response.content = file
-    return response
+    # Only files tracked in the artifact store are served, file_name is never used as a path
+    file_name = os.path.basename(request.GET.get('file_name', None) or '')
+    artifact = models.Artifact.objects.filter(file_name=file_name, is_active=True).first()
+    path = artifacts.get_path(file_name) if artifact is not None else None
+    if path is None or not os.path.isfile(path):
+        raise Http404
+    artifacts.touch(artifact)
+    content_type = mimetypes.guess_type(artifact.name)[0] or 'text/csv'
+    # File is streamed in chunks and closed once the response is sent
+    return FileResponse(
+        open(path, mode='rb'), as_attachment=True, filename=artifact.name, content_type=content_type
+    )
+
+
+class JobAPIView(APIView):
+    """
+    APIView for returning status, progress and generated file of a background job
+    """
+
+    def get(self, request, pk):
+        queryset = models.Job.objects.filter(id=pk, is_active=True)
+        if not has_role(request.user, 'Admin'):
+            queryset = queryset.filter(created_by_id=request.user.id)
+        job = queryset.first()
+        if job is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        serializer = serializers.JobSerializer(job)
+        return Response(status=status.HTTP_200_OK, data=serializer.data)
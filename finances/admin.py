@@ -23,7 +23,7 @@ class FeeStructureAdmin(admin.ModelAdmin):
 
 
 class FeeChallanAdmin(admin.ModelAdmin):
-    list_display = ('student', 'due_date', 'paid', 'discount', 'total')
+    list_display = ('student', 'due_date', 'paid', 'discount', 'total', 'status')
     list_display_links = ('student',)
 
 
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class FinancesConfig(AppConfig):
     name = 'finances'
+
+    def ready(self):
+        from finances import signals
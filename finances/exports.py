@@ -0,0 +1,22 @@
+from common.exports import get_file_name
+from finances import models, serializers
+from finances.views import ChallanViewSet, TransactionDetailsAPIView
+
+
+def get_challans_export(**params):
+    queryset = ChallanViewSet.get_filtered_queryset(params)
+    return get_file_name('fees'), [
+        'Invoice #', 'GR #', 'Name', 'Section', 'Fee (Rs.)', 'Paid (Rs.)', 'Discount (Rs.)', 'Due Date', 'Status',
+    ], queryset, ChallanViewSet.get_csv_row
+
+
+def get_transactions_export(transaction_type, **params):
+    filter_serializer = serializers.ItemFilterSerializer(data=params)
+    filter_serializer.is_valid(raise_exception=True)
+    queryset = TransactionDetailsAPIView.get_filtered_queryset(
+        filter_serializer.validated_data, transaction_type
+    )
+    report_type = 'income' if transaction_type == models.DEBIT else 'expenses'
+    return get_file_name(report_type), [
+        'Title', 'Category', 'Amount', 'Date',
+    ], queryset, TransactionDetailsAPIView.get_csv_row
@@ -0,0 +1,140 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, Value
+from django.utils import timezone
+
+from accounts import models as accounts_models
+from common.benchmarks import analyze, get_keyset_page_queryset, run_cases
+from finances import models
+from finances.services.rollups import FinanceRollupService
+from finances.views import ChallanViewSet, TransactionDetailsAPIView
+
+
+class Command(BaseCommand):
+    """
+    Seeds dummy transactions and challans and measures finance list queries
+    """
+    help = "Creates dummy transactions and challans, then runs finance list queries under EXPLAIN ANALYZE"
+
+    BATCH_SIZE = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--transactions', type=int, default=0,
+            help='Number of dummy transactions to create over the last --days days')
+        parser.add_argument(
+            '--challans', type=int, default=0,
+            help='Number of dummy challans to create, due monthly over the last --days days')
+        parser.add_argument('--days', type=int, default=5 * 365, help='Days covered by dummy rows')
+        parser.add_argument('--runs', type=int, default=5, help='Times each query is run')
+        parser.add_argument('--page', type=int, default=1000, help='Page measured deep in cursor paginated lists')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN ANALYZE requires PostgreSQL')
+        days = options['days']
+        if options['transactions'] > 0:
+            self.create_transactions(options['transactions'], days)
+            self.stdout.write(f'Created {options["transactions"]} transactions.')
+        if options['challans'] > 0:
+            self.create_challans(options['challans'], days)
+            self.stdout.write(f'Created {options["challans"]} challans.')
+        run_cases(self, self.get_cases(options['page']), options['runs'])
+
+    def create_transactions(self, count, days):
+        account, _ = models.Account.objects.get_or_create(name='Dummy account')
+        categories = [
+            models.TransactionCategory.objects.create(
+                name=f'Dummy {name} {index}', category_type=category_type
+            )
+            for name, category_type in (('income', models.DEBIT), ('expense', models.CREDIT))
+            for index in range(5)
+        ]
+        today = datetime.date.today()
+        transactions = []
+        for index in range(count):
+            category = categories[index * 7919 % len(categories)]
+            transactions.append(models.Transaction(
+                account_id=account.id, title=f'Dummy {index}', category_id=category.id,
+                amount=index % 997 + 1, account_balance=0, transaction_type=category.category_type,
+                date=today - datetime.timedelta(days=index % days),
+            ))
+            if len(transactions) == self.BATCH_SIZE:
+                models.Transaction.objects.bulk_create(transactions)
+                transactions = []
+        models.Transaction.objects.bulk_create(transactions)
+        FinanceRollupService.rebuild()
+        analyze(models.Transaction, models.TransactionCategory)
+
+    def create_challans(self, count, days):
+        student_ids = list(accounts_models.User.objects.filter(
+            profile__profile_type=accounts_models.Profile.STUDENT
+        ).values_list('id', flat=True)) or [None]
+        today = datetime.date.today()
+        months = max(days // 30, 1)
+        last_id = models.FeeChallan.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        challans = []
+        for index in range(count):
+            # Challans are issued month by month, so later challans fall due later
+            challan = models.FeeChallan(
+                student_id=student_ids[index % len(student_ids)], break_down={'Tuition': 1000},
+                total=1000, paid=1000 if index % 3 == 0 else 0,
+                due_date=today - datetime.timedelta(days=30 * ((count - 1 - index) * months // count)),
+                is_active=index % 20 != 0,
+            )
+            challan.update_status()
+            challans.append(challan)
+            if len(challans) == self.BATCH_SIZE:
+                models.FeeChallan.objects.bulk_create(challans)
+                challans = []
+        models.FeeChallan.objects.bulk_create(challans)
+
+        # Spread creation times a minute apart, created_at is set to now on insert
+        models.FeeChallan.objects.filter(id__gt=last_id).update(created_at=ExpressionWrapper(
+            Value(timezone.now(), output_field=DateTimeField()) - ExpressionWrapper(
+                (Value(last_id + count) - F('id')) * Value(datetime.timedelta(minutes=1)),
+                output_field=DurationField()
+            ),
+            output_field=DateTimeField()
+        ))
+        analyze(models.FeeChallan)
+
+    @staticmethod
+    def get_cases(page):
+        month_end = datetime.date.today().replace(day=1) - datetime.timedelta(days=1)
+        month = {'start_date': month_end.replace(day=1), 'end_date': month_end}
+        category_id = models.TransactionCategory.objects.filter(
+            category_type=models.DEBIT
+        ).order_by('-id').values_list('id', flat=True).first()
+        transactions = TransactionDetailsAPIView.get_filtered_queryset(month, models.DEBIT)
+        category = TransactionDetailsAPIView.get_filtered_queryset(
+            dict(month, category_id=category_id), models.DEBIT
+        )
+        year = TransactionDetailsAPIView.get_filtered_queryset({
+            'start_date': month_end - datetime.timedelta(days=365), 'end_date': month_end,
+        }, models.DEBIT)
+        quarter = {
+            'from': (month_end - datetime.timedelta(days=90)).isoformat(), 'to': month_end.isoformat(),
+        }
+        year_ago = month_end - datetime.timedelta(days=365)
+        past_quarter = {
+            'from': (year_ago - datetime.timedelta(days=90)).isoformat(), 'to': year_ago.isoformat(),
+        }
+        challans = ChallanViewSet.get_filtered_queryset({})
+        return [
+            ('transactions of a month, page 1', transactions[:20], False),
+            ('transactions of a month, count', transactions, True),
+            ('transactions of a category, page 1', category[:20], False),
+            (f'transactions of a year, cursor page {page}',
+             get_keyset_page_queryset(year, page, 20, '-date'), False),
+            ('challans, page 1', challans[:20], False),
+            (f'challans, cursor page {page}',
+             get_keyset_page_queryset(challans, page, 20, '-created_at'), False),
+            ('challans due in a quarter, page 1', ChallanViewSet.get_filtered_queryset(quarter)[:20], False),
+            ('challans due a year ago, page 1',
+             ChallanViewSet.get_filtered_queryset(past_quarter)[:20], False),
+            ('unpaid challans due in a quarter, count',
+             ChallanViewSet.get_filtered_queryset(dict(quarter, status='unpaid')), True),
+        ]
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from finances.services.rollups import FinanceRollupService
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds daily transaction rollups from transactions
+    """
+    help = "Recomputes daily transaction rollups of every category from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows written per query')
+
+    def handle(self, *args, **options):
+        rollups = FinanceRollupService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'Rebuilt {rollups} daily transaction rollups.')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from finances.services.balances import StudentBalanceService
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds challan statuses and student balances from challans
+    """
+    help = "Recomputes status and outstanding amount of challans and balances of students"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows written per query')
+
+    def handle(self, *args, **options):
+        challans, balances = StudentBalanceService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'Updated {challans} challans and rebuilt {balances} student balances.')
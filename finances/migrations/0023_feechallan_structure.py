@@ -0,0 +1,19 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0022_paymentkey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feechallan',
+            name='structure',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='challans', to='finances.FeeStructure'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+PAID = 2
+UNPAID = 1
+
+
+def populate_balances(apps, schema_editor):
+    FeeChallan = apps.get_model('finances', 'FeeChallan')
+    StudentBalance = apps.get_model('finances', 'StudentBalance')
+    challans = []
+    for challan in FeeChallan.objects.all().iterator(chunk_size=1000):
+        payable = challan.total - (challan.discount or 0)
+        challan.outstanding = max(payable - (challan.paid or 0), 0)
+        challan.status = PAID if challan.outstanding == 0 else UNPAID
+        challans.append(challan)
+    FeeChallan.objects.bulk_update(challans, ['status', 'outstanding'], batch_size=1000)
+
+    totals = FeeChallan.objects.filter(
+        is_active=True, status=UNPAID, student_id__isnull=False
+    ).values('student_id').annotate(
+        outstanding_sum=Sum('outstanding'), unpaid_count=Count('id')
+    ).order_by('student_id')
+    StudentBalance.objects.bulk_create([
+        StudentBalance(
+            student_id=total['student_id'], outstanding=total['outstanding_sum'],
+            unpaid_challans=total['unpaid_count']
+        ) for total in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('finances', '0023_feechallan_structure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentBalance',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('outstanding', models.FloatField(db_index=True, default=0)),
+                ('unpaid_challans', models.IntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='feechallan',
+            name='outstanding',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='feechallan',
+            name='status',
+            field=models.IntegerField(choices=[(1, 'Unpaid'), (2, 'Paid')], default=1),
+        ),
+        migrations.AddIndex(
+            model_name='feechallan',
+            index=models.Index(fields=['status', 'due_date'], name='finances_fe_status_8ef824_idx'),
+        ),
+        migrations.AddField(
+            model_name='studentbalance',
+            name='student',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:25
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+def clear_empty_break_downs(apps, schema_editor):
+    # Text is cast to jsonb when the column type changes, empty text is not valid JSON
+    FeeChallan = apps.get_model('finances', 'FeeChallan')
+    FeeChallan.objects.filter(break_down='').update(break_down='{}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0024_auto_20261018_1514'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_empty_break_downs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='feechallan',
+            name='break_down',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:26
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+# Amounts sent as numeric strings are stored as numbers so heads can be summed in SQL
+NUMERIC_AMOUNTS_SQL = '''
+UPDATE {table} SET break_down = (
+    SELECT jsonb_object_agg(key, CASE
+        WHEN jsonb_typeof(value) = 'string' AND value #>> '{{}}' ~ '^\\s*-?[0-9]+(\\.[0-9]+)?\\s*$'
+        THEN to_jsonb((value #>> '{{}}')::numeric)
+        ELSE value
+    END)
+    FROM jsonb_each(break_down)
+)
+WHERE jsonb_typeof(break_down) = 'object' AND EXISTS (
+    SELECT 1 FROM jsonb_each(break_down) WHERE jsonb_typeof(value) = 'string'
+)
+'''
+
+
+def clear_empty_break_downs(apps, schema_editor):
+    # Text is cast to jsonb when the column type changes, empty text is not valid JSON
+    FeeStructure = apps.get_model('finances', 'FeeStructure')
+    FeeStructure.objects.filter(break_down='').update(break_down='{}')
+
+
+def convert_amounts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ('finances_feestructure', 'finances_feechallan'):
+        schema_editor.execute(NUMERIC_AMOUNTS_SQL.format(table=table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0025_auto_20261018_1525'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_empty_break_downs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='feestructure',
+            name='break_down',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=dict),
+        ),
+        migrations.RunPython(convert_amounts, migrations.RunPython.noop),
+    ]
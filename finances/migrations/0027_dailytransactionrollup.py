@@ -0,0 +1,48 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def populate_rollups(apps, schema_editor):
+    Transaction = apps.get_model('finances', 'Transaction')
+    DailyTransactionRollup = apps.get_model('finances', 'DailyTransactionRollup')
+    totals = Transaction.objects.values('date', 'transaction_type', 'category_id').annotate(
+        amount_sum=Sum('amount'), count=Count('id')
+    ).order_by()
+    DailyTransactionRollup.objects.bulk_create([
+        DailyTransactionRollup(
+            date=total['date'], transaction_type=total['transaction_type'],
+            category_id=total['category_id'], amount=total['amount_sum'],
+            transactions=total['count']
+        ) for total in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0026_auto_20261018_1526'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTransactionRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('date', models.DateField()),
+                ('transaction_type', models.IntegerField(choices=[(1, 'Debit'), (2, 'Credit')])),
+                ('amount', models.FloatField(default=0)),
+                ('transactions', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='finances.TransactionCategory')),
+            ],
+            options={
+                'unique_together': {('date', 'transaction_type', 'category')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0027_dailytransactionrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='finances.TransactionCategory'),
+        ),
+        migrations.AddIndex(
+            model_name='feechallan',
+            index=models.Index(condition=models.Q(is_active=True), fields=['created_at', 'id'], name='finances_fc_active_created'),
+        ),
+        migrations.AddIndex(
+            model_name='feechallan',
+            index=models.Index(condition=models.Q(is_active=True), fields=['due_date'], name='finances_fc_active_due_date'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_type', 'date', 'id'], name='finances_tr_transac_80e76f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['category', 'date', 'id'], name='finances_tr_categor_4c1353_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.1 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0028_auto_20261018_1531'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentkey',
+            name='payments_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
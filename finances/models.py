@@ -1,4 +1,6 @@
+from django.contrib.postgres.fields import JSONField
 from django.db import models
+from django.db.models import Q
 from datetime import date
 from accounts.models import User
 from common.models import BaseModel
@@ -36,8 +38,9 @@ class Transaction(BaseModel):
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
     title = models.CharField(max_length=128)
     description = models.TextField(max_length=512, null=True, blank=True)
+    # Indexed along with date in Meta.indexes
     category = models.ForeignKey(TransactionCategory, on_delete=models.CASCADE,
-        related_name='transactions')
+        related_name='transactions', db_index=False)
     amount = models.FloatField()
     account_balance = models.FloatField()
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
@@ -49,12 +52,35 @@ class Transaction(BaseModel):
         (CREDIT, 'Credit')
     )
     transaction_type = models.IntegerField(choices=TypeChoices)
+
+    class Meta:
+        # Transactions are listed by type or category within a date range, newest first
+        indexes = [
+            models.Index(fields=['transaction_type', 'date', 'id']),
+            models.Index(fields=['category', 'date', 'id']),
+        ]
     
 
+class DailyTransactionRollup(BaseModel):
+    """
+    Amount and number of transactions of a category on a day, maintained whenever
+    transactions are posted so summaries do not have to scan every transaction.
+    """
+    date = models.DateField()
+    transaction_type = models.IntegerField(choices=Transaction.TypeChoices)
+    category = models.ForeignKey(TransactionCategory, on_delete=models.CASCADE,
+        related_name='daily_rollups')
+    amount = models.FloatField(default=0)
+    transactions = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['date', 'transaction_type', 'category']
+
+
 class FeeStructure(BaseModel):
     name = models.CharField(max_length=128)
     description = models.TextField(max_length=512, null=True, blank=True)
-    break_down = models.TextField(max_length=2048)
+    break_down = JSONField(default=dict)  # Fee heads mapped to their amounts
     total = models.FloatField()
 
     def __str__(self):
@@ -64,7 +90,9 @@ class FeeStructure(BaseModel):
 class FeeChallan(BaseModel):
     student = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
                                 related_name='challans')
-    break_down = models.TextField(max_length=2048)
+    structure = models.ForeignKey(FeeStructure, on_delete=models.SET_NULL, null=True,
+                                  blank=True, related_name='challans')
+    break_down = JSONField(default=dict)
     total = models.FloatField()
     paid = models.FloatField(default=0, null=True, blank=True)
     discount = models.FloatField(default=0, null=True, blank=True)
@@ -76,5 +104,62 @@ class FeeChallan(BaseModel):
     received_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
                                     related_name='received_challans', blank=True)
 
+    UNPAID = 1
+    PAID = 2
+    StatusChoices = (
+        (UNPAID, 'Unpaid'),
+        (PAID, 'Paid'),
+    )
+    # Derived from total, paid and discount by update_status
+    status = models.IntegerField(choices=StatusChoices, default=UNPAID)
+    outstanding = models.FloatField(default=0)
+
+    class Meta:
+        # Partial indexes only cover active challans, which are the ones listed
+        indexes = [
+            models.Index(fields=['status', 'due_date']),
+            models.Index(fields=['created_at', 'id'], condition=Q(is_active=True),
+                         name='finances_fc_active_created'),
+            models.Index(fields=['due_date'], condition=Q(is_active=True),
+                         name='finances_fc_active_due_date'),
+        ]
+
     def __str__(self):
         return 'Challan for Student ID: {0}'.format(self.student.id)
+
+    def update_status(self):
+        payable = self.total - (self.discount or 0)
+        self.outstanding = max(payable - (self.paid or 0), 0)
+        self.status = self.PAID if self.outstanding == 0 else self.UNPAID
+
+    def get_balance(self):
+        """
+        Returns outstanding amount and number of unpaid challans this challan adds to
+        the balance of its student.
+        """
+        if not self.is_active or self.status == self.PAID:
+            return 0, 0
+        return self.outstanding, 1
+
+
+class StudentBalance(BaseModel):
+    """
+    Outstanding amount of active challans of a student, maintained whenever
+    challans are created, paid or deleted.
+    """
+    student = models.OneToOneField(User, on_delete=models.CASCADE, related_name='balance')
+    outstanding = models.FloatField(default=0, db_index=True)
+    unpaid_challans = models.IntegerField(default=0)
+
+
+class PaymentKey(BaseModel):
+    """
+    Idempotency key sent by a client with a payment, a retried payment with the same key
+    returns challans of the original payment instead of being recorded again.
+    Payments hash is null for keys recorded before payments were hashed.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    challan_ids = models.TextField(max_length=2048)
+    payments_hash = models.CharField(max_length=64, null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+        related_name='payment_keys')
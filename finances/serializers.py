@@ -4,6 +4,8 @@ from rest_framework import serializers
 
 from accounts import models as accounts_models
 from finances import models
+from finances.services.balances import StudentBalanceService
+from finances.services.ledger import LedgerService
 from structure.models import Grade
 import json
 
@@ -29,21 +31,38 @@ class TransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ('account_balance', 'created_by', 'created_at')
 
     def create(self, validated_data):
-        data = validated_data
-        data['created_by'] = self.context['user']
-        if data['transaction_type'] == models.CREDIT:
-            data['account_balance'] = data['account'].balance - data['amount']
-        else:
-            data['account_balance'] = data['account'].balance + data['amount']
-        with transaction.atomic():
-            instance = models.Transaction.objects.create(**validated_data)
-            account = validated_data['account']
-            account.balance = data['account_balance']
-            account.save()
+        data = dict(validated_data)
+        account = data.pop('account')
+        instance = LedgerService.post_transaction(account.id, data, self.context['user'])
+        account.balance = instance.account_balance
         return instance
         
 
+class BreakDownField(serializers.JSONField):
+    """
+    Fee heads mapped to their amounts, a JSON encoded string as sent by older clients
+    is accepted as well.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                self.fail('invalid')
+        if not isinstance(data, dict):
+            raise serializers.ValidationError('Break down must map fee heads to amounts')
+        break_down = {}
+        for head, amount in data.items():
+            try:
+                break_down[head] = float(amount)
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(f'Amount of {head} must be a number')
+        return break_down
+
+
 class FeeStructureSerializer(serializers.ModelSerializer):
+    break_down = BreakDownField()
 
     class Meta:
         model = models.FeeStructure
@@ -58,57 +77,77 @@ class CreateChallanSerializer(serializers.Serializer):
     due_date = serializers.DateField()
     target_value = serializers.JSONField()
 
+    BATCH_SIZE = 1000
+
     def save(self, **kwargs):
-        data = self.validated_data
-        
-        if data['target_type'] == 'individuals':  # Fetch ids from target_value
-            ids = data['target_value']
-        else:
-            target_value = data['target_value']
-            if target_value['grade_id'] == -1:  # All grades
-                ids = [a[0] for a in accounts_models.Profile.objects.filter(
-                    is_active=True, profile_type=accounts_models.Profile.STUDENT
-                ).values_list('user_id')]
-            else:
-                if target_value['section_id'] == -1:  # All sections of a grade
-                    ids = [a[0] for a in accounts_models.Profile.objects.filter(
-                        is_active=True,
-                        profile_type=accounts_models.Profile.STUDENT,
-                        student_info__section__grade_id=target_value['grade_id']
-                    ).values_list('user_id')]
-                else:
-                    ids = [a[0] for a in accounts_models.StudentInfo.objects.filter(
-                        is_active=True,
-                        section_id=target_value['section_id']
-                        ).values_list('profile__user_id')]
-                    ids = [a[0] for a in accounts_models.Profile.objects.filter(
-                        is_active=True,
-                        profile_type=accounts_models.Profile.STUDENT,
-                        student_info__section_id=target_value['section_id']
-                    ).values_list('user_id')]
-
-        challans = []
-        structure = models.FeeStructure.objects.get(id=data['structure_id'])
-        for id in ids:
-            challan = models.FeeChallan()
-            challan.student_id = id
-            challan.break_down = structure.break_down
-            challan.total = structure.total
-            challan.due_date = data['due_date']
-            challan.description = data['description']
-            
-            challans.append(challan)
+        """
+        Creates challans of the fee structure for targeted students in batches of BATCH_SIZE,
+        skipping students who already have a challan of the same structure and due date.
         
+        Returns:
+            dict: Number of created and skipped challans
+        """
+        data = self.validated_data
+        students = self.get_students_queryset(data['target_type'], data['target_value'])
+
+        created = 0
+        with transaction.atomic():
+            # Concurrent requests for the structure wait here until challans created by
+            # the earlier one are committed, so they are skipped instead of duplicated
+            structure = models.FeeStructure.objects.select_for_update().get(id=self.structure.id)
+            # Challans whose student was deleted are excluded, a NULL in the subquery
+            # would make NOT IN exclude every student
+            existing = models.FeeChallan.objects.filter(
+                is_active=True, structure_id=structure.id, due_date=data['due_date'],
+                student_id__isnull=False,
+            ).values('student_id')
+            targeted = students.count()
+            student_ids = students.exclude(id__in=existing).values_list('id', flat=True).order_by('id')
+            batch = []
+            for student_id in student_ids.iterator(chunk_size=self.BATCH_SIZE):
+                challan = models.FeeChallan(
+                    student_id=student_id, structure_id=structure.id,
+                    break_down=structure.break_down, total=structure.total,
+                    due_date=data['due_date'], description=data['description'],
+                )
+                challan.update_status()
+                batch.append(challan)
+                if len(batch) == self.BATCH_SIZE:
+                    created += self.create_challans(batch)
+                    batch = []
+            created += self.create_challans(batch)
+        return {
+            'created': created,
+            'skipped': targeted - created,
+        }
+
+    @staticmethod
+    def create_challans(challans):
         models.FeeChallan.objects.bulk_create(challans)
+        StudentBalanceService.update_balances(
+            [StudentBalanceService.get_change(challan) for challan in challans]
+        )
+        return len(challans)
 
+    @staticmethod
+    def get_students_queryset(target_type, target_value):
+        if target_type == 'individuals':  # Fetch ids from target_value
+            return accounts_models.User.objects.filter(id__in=target_value)
+        queryset = accounts_models.User.objects.filter(
+            profile__is_active=True,
+            profile__profile_type=accounts_models.Profile.STUDENT
+        )
+        if target_value['grade_id'] == -1:  # All grades
+            return queryset
+        if target_value['section_id'] == -1:  # All sections of a grade
+            return queryset.filter(profile__student_info__section__grade_id=target_value['grade_id'])
+        return queryset.filter(profile__student_info__section_id=target_value['section_id'])
 
     def validate_structure_id(self, value):
-        try:
-            models.FeeStructure.objects.get(id=value)
-        except:
+        self.structure = models.FeeStructure.objects.filter(id=value).first()
+        if self.structure is None:
             raise serializers.ValidationError("Invalid structure id")
-        else:
-            return value
+        return value
 
     def validate_target_type(self, value):
         if value in ['individuals', 'group']:
@@ -158,26 +197,52 @@ class CreateChallanSerializer(serializers.Serializer):
                 }
 
 
-class FeeChallanSerializer(serializers.ModelSerializer):
-    break_down = serializers.SerializerMethodField()
-    student = serializers.SerializerMethodField()
+class FeeChallanSerializer(serializers.BaseSerializer):
+    """
+    Read only serializer of challan rows selected by get_values, rows are mapped
+    directly so challans and their students are never loaded as model instances.
+    """
+    VALUES = (
+        'id', 'student_id', 'break_down', 'total', 'paid', 'late_fee', 'discount',
+        'due_date', 'paid_at', 'paid_by', 'description', 'received_by_id',
+        'status',  # Read by the CSV export, not part of the payload
+        'student__profile__fullname', 'student__profile__student_info__gr_number',
+        'student__profile__student_info__guardian_name',
+        'student__profile__student_info__section__name',
+        'student__profile__student_info__section__grade__name',
+        'created_at',  # Keyset of cursor pages
+    )
+    date_field = serializers.DateField()
+    datetime_field = serializers.DateTimeField()
 
-    class Meta:
-        model = models.FeeChallan
-        fields = ('id', 'student', 'break_down', 'total', 'paid', 'late_fee', 'discount',
-            'due_date', 'paid_at', 'paid_by', 'description', 'received_by')
-        
-    def get_break_down(self, obj):
-        return json.loads(obj.break_down)
+    @staticmethod
+    def get_values(queryset):
+        return queryset.values(*FeeChallanSerializer.VALUES)
 
-    def get_student(self, obj):
+    def to_representation(self, row):
+        student = None
+        if row['student_id'] is not None:
+            student = {
+                'id': row['student_id'],
+                'gr_number': row['student__profile__student_info__gr_number'],
+                'fullname': row['student__profile__fullname'],
+                'guardian_name': row['student__profile__student_info__guardian_name'],
+                'grade': row['student__profile__student_info__section__grade__name'],
+                'section': row['student__profile__student_info__section__name'],
+            }
         return {
-            'id': obj.student.id,
-            'gr_number': obj.student.profile.student_info.gr_number,
-            'fullname': obj.student.profile.fullname,
-            'guardian_name': obj.student.profile.student_info.guardian_name,
-            'grade': obj.student.profile.student_info.section.grade.name,
-            'section': obj.student.profile.student_info.section.name,
+            'id': row['id'],
+            'student': student,
+            'break_down': row['break_down'],
+            'total': row['total'],
+            'paid': row['paid'],
+            'late_fee': row['late_fee'],
+            'discount': row['discount'],
+            'due_date': self.date_field.to_representation(row['due_date']),
+            'paid_at': self.datetime_field.to_representation(row['paid_at']),
+            'paid_by': row['paid_by'],
+            'description': row['description'],
+            'received_by': row['received_by_id'],
         }
 
 
@@ -188,6 +253,10 @@ class FeeChallanPaymentSerializer(serializers.Serializer):
     payment_date = serializers.DateTimeField()
 
 
+class FeeChallanBulkPaymentSerializer(FeeChallanPaymentSerializer):
+    challan_id = serializers.IntegerField()
+
+
 class ItemFilterSerializer(serializers.Serializer):
     start_date = serializers.DateField()
     end_date = serializers.DateField()
@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from finances import models
+
+
+class StudentBalanceService:
+    '''
+    Service for maintaining outstanding balances of students from their challans.
+    '''
+
+    @staticmethod
+    def get_change(challan, previous_balance=(0, 0)):
+        """
+        Returns change in balance of the challan's student given the balance the
+        challan contributed before being modified, see FeeChallan.get_balance.
+        """
+        outstanding, unpaid_challans = challan.get_balance()
+        return (
+            challan.student_id,
+            outstanding - previous_balance[0],
+            unpaid_challans - previous_balance[1],
+        )
+
+    @staticmethod
+    def update_balances(changes):
+        """
+        Applies changes to balances of students, locking each balance row once.
+        
+        Parameters:
+            changes ([tuple]): Student id, change in outstanding amount and
+                change in number of unpaid challans
+        """
+        deltas = {}
+        for student_id, outstanding, unpaid_challans in changes:
+            if student_id is None:
+                continue
+            current = deltas.get(student_id, (0, 0))
+            deltas[student_id] = (current[0] + outstanding, current[1] + unpaid_challans)
+        deltas = {key: value for key, value in deltas.items() if value != (0, 0)}
+        if len(deltas) == 0:
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            models.StudentBalance.objects.bulk_create(
+                [models.StudentBalance(student_id=student_id) for student_id in deltas],
+                ignore_conflicts=True
+            )
+            balances = list(models.StudentBalance.objects.select_for_update().filter(
+                student_id__in=deltas.keys()
+            ).order_by('student_id'))
+            for balance in balances:
+                outstanding, unpaid_challans = deltas[balance.student_id]
+                balance.outstanding = balance.outstanding + outstanding
+                balance.unpaid_challans = balance.unpaid_challans + unpaid_challans
+                balance.updated_at = now
+            models.StudentBalance.objects.bulk_update(
+                balances, ['outstanding', 'unpaid_challans', 'updated_at']
+            )
+
+    @staticmethod
+    def rebuild(batch_size=1000):
+        """
+        Recomputes status and outstanding amount of every challan and balances of all students.
+        
+        Returns:
+            tuple: Number of updated challans and created balances
+        """
+        with transaction.atomic():
+            challans = []
+            updated = 0
+            for challan in models.FeeChallan.objects.all().iterator(chunk_size=batch_size):
+                challan.update_status()
+                challans.append(challan)
+                if len(challans) == batch_size:
+                    models.FeeChallan.objects.bulk_update(challans, ['status', 'outstanding'])
+                    updated += len(challans)
+                    challans = []
+            models.FeeChallan.objects.bulk_update(challans, ['status', 'outstanding'])
+            updated += len(challans)
+
+            models.StudentBalance.objects.all().delete()
+            totals = models.FeeChallan.objects.filter(
+                is_active=True, status=models.FeeChallan.UNPAID, student_id__isnull=False
+            ).values('student_id').annotate(
+                outstanding_sum=Sum('outstanding'), unpaid_count=Count('id')
+            ).order_by('student_id')
+            balances = models.StudentBalance.objects.bulk_create([
+                models.StudentBalance(
+                    student_id=total['student_id'], outstanding=total['outstanding_sum'],
+                    unpaid_challans=total['unpaid_count']
+                ) for total in totals
+            ], batch_size=batch_size)
+        return updated, len(balances)
@@ -0,0 +1,130 @@
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from common.references import get_config
+from finances import models
+from finances.services.balances import StudentBalanceService
+from finances.services.ledger import LedgerService
+
+
+class IdempotencyKeyConflict(Exception):
+    '''
+    Raised when an idempotency key is sent again with payments other than the ones
+    recorded with it.
+    '''
+
+
+class ChallanPaymentService:
+    '''
+    Service for recording fee challan payments along with their income transactions.
+    '''
+
+    @staticmethod
+    def get_fees_category_id():
+        return get_config('FEES_CATEGORY_ID')
+
+    @staticmethod
+    def pay_challans(payments, user=None, idempotency_key=None):
+        """
+        Records payments of multiple challans in a single database transaction. Challans
+        are locked once, updated in one query and their income transactions are posted to
+        the default account as one batch. Either every payment and transaction is recorded
+        or none of them.
+        
+        Parameters:
+            payments ([dict]): Validated data of FeeChallanBulkPaymentSerializer
+            user (Model): User receiving the payments
+            idempotency_key (str): Key identifying this request, if the same payments were
+                recorded earlier with this key nothing is recorded and their challans are returned
+        
+        Returns:
+            tuple: Paid challans in the order of payments with None for challans which do
+            not exist, and whether the payment was recorded earlier with the same key
+        
+        Raises:
+            IdempotencyKeyConflict: If the key was recorded earlier with other payments
+        """
+        fees_category_id = ChallanPaymentService.get_fees_category_id()
+        account_id = LedgerService.get_default_account_id()
+        ids = [payment['challan_id'] for payment in payments]
+        now = timezone.now()
+        with transaction.atomic():
+            if idempotency_key is not None:
+                payments_hash = ChallanPaymentService.get_payments_hash(payments)
+                payment_key = ChallanPaymentService.claim_key(idempotency_key, ids, payments_hash, user)
+                if payment_key is not None:
+                    previous_ids = json.loads(payment_key.challan_ids)
+                    if payment_key.payments_hash not in (None, payments_hash) or previous_ids != ids:
+                        raise IdempotencyKeyConflict()
+                    return ChallanPaymentService.get_challans(previous_ids), True
+
+            challans = models.FeeChallan.objects.select_for_update(of=('self',)).filter(
+                id__in=ids, is_active=True
+            ).order_by('id')
+            challans = {challan.id: challan for challan in challans}
+            if len(challans) < len(set(ids)):
+                transaction.set_rollback(True)
+                return [challans.get(id, None) for id in ids], False
+
+            balances = {challan.id: challan.get_balance() for challan in challans.values()}
+            entries = []
+            for payment in payments:
+                challan = challans[payment['challan_id']]
+                challan.paid = challan.paid + payment['paid']
+                challan.late_fee = challan.late_fee + payment['late_fee']
+                challan.discount = payment['discount']
+                challan.paid_at = payment['payment_date']
+                challan.updated_at = now
+                challan.update_status()
+                entries.append({
+                    'title': 'Invoice #: {0}'.format(challan.id),
+                    'category_id': fees_category_id,
+                    'amount': payment['paid'],
+                    'transaction_type': models.DEBIT,
+                })
+            models.FeeChallan.objects.bulk_update(challans.values(), [
+                'paid', 'late_fee', 'discount', 'paid_at', 'status', 'outstanding', 'updated_at'
+            ])
+            StudentBalanceService.update_balances([
+                StudentBalanceService.get_change(challan, balances[challan.id])
+                for challan in challans.values()
+            ])
+            LedgerService.post_transactions(account_id, entries, user)
+        return [challans[id] for id in ids], False
+
+    @staticmethod
+    def claim_key(key, challan_ids, payments_hash, user=None):
+        """
+        Records an idempotency key within the current transaction. A concurrent request with
+        the same key waits on the unique index until this transaction ends, so the payment
+        is recorded at most once.
+        
+        Returns:
+            Model: Key of the earlier payment with this key, None if the key is new
+        """
+        try:
+            with transaction.atomic():
+                models.PaymentKey.objects.create(
+                    key=key, challan_ids=json.dumps(challan_ids),
+                    payments_hash=payments_hash, created_by=user
+                )
+        except IntegrityError:
+            return models.PaymentKey.objects.get(key=key)
+        return None
+
+    @staticmethod
+    def get_payments_hash(payments):
+        """
+        Returns a hash of validated payments, identical for a retry of the same request.
+        """
+        value = json.dumps(payments, sort_keys=True, default=str)
+        return hashlib.sha256(value.encode()).hexdigest()
+
+    @staticmethod
+    def get_challans(ids):
+        challans = models.FeeChallan.objects.filter(id__in=ids)
+        challans = {challan.id: challan for challan in challans}
+        return [challans.get(id, None) for id in ids]
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.utils import timezone
+
+from common.references import get_reference
+from finances import models
+from finances.services.rollups import FinanceRollupService
+
+
+class LedgerService:
+    '''
+    Service for posting transactions to accounts. Postings to an account are serialized
+    by locking its row, so concurrent postings never compute a balance from a stale read.
+    '''
+
+    @staticmethod
+    def get_default_account_id():
+        return get_reference(
+            'default_account_id',
+            lambda: models.Account.objects.filter(is_default=True).values_list('id', flat=True).first()
+        )
+
+    @staticmethod
+    def post_transaction(account_id, entry, user=None):
+        """
+        Posts a single transaction to an account.
+        
+        Parameters:
+            account_id (int): Id of the account
+            entry (dict): Fields of the transaction, including amount and transaction_type
+            user (Model): User posting the transaction
+        
+        Returns:
+            Model: An instance of created transaction
+        """
+        return LedgerService.post_transactions(account_id, [entry], user)[0]
+
+    @staticmethod
+    def post_transactions(account_id, entries, user=None):
+        """
+        Posts transactions to an account in the given order within a single database
+        transaction. The account row is locked once, running balances are computed in
+        memory, transactions are inserted in one batch and the balance is written once.
+        Daily rollups of the transactions are updated in the same database transaction.
+        
+        Parameters:
+            account_id (int): Id of the account
+            entries ([dict]): Fields of each transaction, including amount and transaction_type
+            user (Model): User posting the transactions
+        
+        Returns:
+            [Model]: Created transactions, each with balance of the account after it
+        """
+        with transaction.atomic():
+            account = models.Account.objects.select_for_update().get(id=account_id)
+            balance = account.balance
+            transactions = []
+            for entry in entries:
+                if entry['transaction_type'] == models.CREDIT:
+                    balance = balance - entry['amount']
+                else:
+                    balance = balance + entry['amount']
+                transactions.append(models.Transaction(
+                    account_id=account.id, account_balance=balance, created_by=user, **entry
+                ))
+            if len(transactions) == 1:
+                transactions[0].save()  # Rollups are updated by the post_save signal
+            elif len(transactions) > 1:
+                models.Transaction.objects.bulk_create(transactions)
+                FinanceRollupService.update_rollups(transactions)
+            account.balance = balance
+            # Updated without save so postings do not evict cached accounts
+            models.Account.objects.filter(id=account.id).update(balance=balance, updated_at=timezone.now())
+        return transactions
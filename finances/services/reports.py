@@ -0,0 +1,38 @@
+from django.db import connection
+
+
+class FeeReportService:
+    '''
+    Service for fee reports computed in the database over break-downs of challans.
+    '''
+
+    HEAD_TOTALS_SQL = '''
+        SELECT head.key, SUM(head.value::text::numeric), COUNT(*)
+        FROM ({challans}) challan
+        CROSS JOIN LATERAL jsonb_each(challan.break_down) head
+        WHERE jsonb_typeof(challan.break_down) = 'object' AND jsonb_typeof(head.value) = 'number'
+        GROUP BY head.key
+        ORDER BY head.key
+    '''
+
+    @staticmethod
+    def get_head_totals(queryset):
+        """
+        Returns amount billed under each fee head of the given challans, e.g. tuition
+        and transport fees of challans due this month, in a single query.
+        
+        Parameters:
+            queryset (QuerySet): Challans to aggregate
+        
+        Returns:
+            [dict]: Name, total amount and number of challans of each head
+        """
+        sql, params = queryset.order_by().values('break_down').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(FeeReportService.HEAD_TOTALS_SQL.format(challans=sql), params)
+            rows = cursor.fetchall()
+        return [{
+            'head': head,
+            'total': float(total),
+            'challans': challans,
+        } for head, total, challans in rows]
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from finances import models
+
+
+class FinanceRollupService:
+    '''
+    Service for maintaining daily transaction rollups per category, which summaries
+    are computed from instead of individual transactions. Batches posted by the ledger
+    are added by it, any other save or delete of a transaction, e.g. in the admin, by
+    signals. Queryset update() bypasses both, rebuild_finance_rollups repairs rollups
+    after such writes.
+    '''
+
+    @staticmethod
+    def update_rollups(transactions, removed=()):
+        """
+        Adds the given transactions to rollups of their day, type and category and
+        subtracts the removed ones. Should be called within the transaction writing them.
+        
+        Parameters:
+            transactions ([Model]): Created transactions, or edited ones as saved
+            removed ([Model]): Deleted transactions, or edited ones as stored before saving
+        """
+        totals = {}
+        for items, sign in ((transactions, 1), (removed, -1)):
+            for item in items:
+                key = (item.date, item.transaction_type, item.category_id)
+                amount, count = totals.get(key, (0, 0))
+                totals[key] = (amount + sign * item.amount, count + sign)
+        # Saving a transaction without changing its day, type, category or amount cancels out
+        totals = {key: total for key, total in totals.items() if total != (0, 0)}
+        if not totals:
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            models.DailyTransactionRollup.objects.bulk_create([
+                models.DailyTransactionRollup(
+                    date=day, transaction_type=transaction_type, category_id=category_id
+                ) for day, transaction_type, category_id in totals
+            ], ignore_conflicts=True)
+            for (day, transaction_type, category_id), (amount, count) in totals.items():
+                models.DailyTransactionRollup.objects.filter(
+                    date=day, transaction_type=transaction_type, category_id=category_id
+                ).update(
+                    amount=F('amount') + amount, transactions=F('transactions') + count,
+                    updated_at=now
+                )
+
+    @staticmethod
+    def rebuild(batch_size=1000):
+        """
+        Recomputes all rollups from transactions.
+        
+        Returns:
+            int: Number of created rollups
+        """
+        with transaction.atomic():
+            models.DailyTransactionRollup.objects.all().delete()
+            totals = models.Transaction.objects.values(
+                'date', 'transaction_type', 'category_id'
+            ).annotate(
+                amount_sum=Sum('amount'), count=Count('id')
+            ).order_by()
+            rollups = models.DailyTransactionRollup.objects.bulk_create([
+                models.DailyTransactionRollup(
+                    date=total['date'], transaction_type=total['transaction_type'],
+                    category_id=total['category_id'], amount=total['amount_sum'],
+                    transactions=total['count']
+                ) for total in totals
+            ], batch_size=batch_size)
+        return len(rollups)
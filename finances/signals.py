@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from finances import models
+from finances.services.rollups import FinanceRollupService
+
+
+@receiver(pre_save, sender=models.Transaction)
+def transaction_saving(sender, instance, raw=False, **kwargs):
+    # Stored version of an edited transaction, removed from rollups once the edit is saved
+    instance._stored = None
+    if instance.pk is not None and not raw:
+        instance._stored = models.Transaction.objects.filter(pk=instance.pk).only(
+            'date', 'transaction_type', 'category_id', 'amount'
+        ).first()
+
+
+@receiver(post_save, sender=models.Transaction)
+def transaction_saved(sender, instance, raw=False, **kwargs):
+    if raw:  # Fixtures are loaded along with their rollups
+        return
+    stored = getattr(instance, '_stored', None)
+    FinanceRollupService.update_rollups([instance], [stored] if stored is not None else [])
+
+
+@receiver(post_delete, sender=models.Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    FinanceRollupService.update_rollups([], [instance])
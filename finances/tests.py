@@ -1,3 +1,227 @@
-from django.test import TestCase
+import datetime
+import threading
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from common.models import Config
+from finances import models
+from finances.services.ledger import LedgerService
+from finances.services.rollups import FinanceRollupService
+
+
+class LedgerTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.account = models.Account.objects.create(name='Cash', balance=0)
+        self.category = models.TransactionCategory.objects.create(
+            name='Fees', category_type=models.DEBIT
+        )
+
+    def post(self, amounts, errors):
+        try:
+            for amount in amounts:
+                LedgerService.post_transaction(self.account.id, {
+                    'title': 'Posting', 'category_id': self.category.id, 'amount': abs(amount),
+                    'transaction_type': models.DEBIT if amount > 0 else models.CREDIT,
+                })
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_concurrent_postings(self):
+        postings = [[(thread + 1) * 10, -thread - 1, 3] for thread in range(8)]
+        errors = []
+        threads = [threading.Thread(target=self.post, args=(amounts, errors)) for amounts in postings]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        total = sum(amount for amounts in postings for amount in amounts)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, total)
+
+        # Each posting starts from the balance left by the one before it
+        balance = 0
+        transactions = models.Transaction.objects.filter(account=self.account).order_by('id')
+        self.assertEqual(len(transactions), 24)
+        for transaction in transactions:
+            balance += transaction.amount if transaction.transaction_type == models.DEBIT else -transaction.amount
+            self.assertEqual(transaction.account_balance, balance)
+        self.assertEqual(balance, total)
+
+
+class RollupTestCase(TestCase):
+
+    def setUp(self):
+        self.account = models.Account.objects.create(name='Cash', balance=0)
+        self.fees, self.donations = [
+            models.TransactionCategory.objects.create(name=name, category_type=models.DEBIT)
+            for name in ('Fees', 'Donations')
+        ]
+
+    def get_rollups(self):
+        return set(models.DailyTransactionRollup.objects.filter(transactions__gt=0).values_list(
+            'date', 'transaction_type', 'category_id', 'amount', 'transactions'
+        ))
+
+    def test_ledger_and_admin_writes(self):
+        entry = {'title': 'Fee', 'category_id': self.fees.id, 'transaction_type': models.DEBIT}
+        single = LedgerService.post_transaction(self.account.id, dict(entry, amount=10))
+        batch = LedgerService.post_transactions(
+            self.account.id, [dict(entry, amount=20), dict(entry, amount=30)]
+        )
+        today = single.date
+        self.assertEqual(self.get_rollups(), {(today, models.DEBIT, self.fees.id, 60, 3)})
+
+        # Edited and deleted the way the admin does, outside the ledger
+        batch[0].amount = 25
+        batch[0].category = self.donations
+        batch[0].save()
+        batch[1].date = today - datetime.timedelta(days=1)
+        batch[1].save()
+        single.save()
+        models.Transaction.objects.filter(id=single.id).delete()
+        models.Transaction.objects.create(
+            account=self.account, title='Donation', category=self.donations,
+            amount=5, account_balance=0, transaction_type=models.DEBIT,
+        )
+
+        rollups = self.get_rollups()
+        self.assertEqual(rollups, {
+            (today, models.DEBIT, self.donations.id, 30, 2),
+            (today - datetime.timedelta(days=1), models.DEBIT, self.fees.id, 30, 1),
+        })
+        FinanceRollupService.rebuild()
+        self.assertEqual(self.get_rollups(), rollups)
+
+
+class ChallanPaymentTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.account = models.Account.objects.create(name='Cash', balance=0, is_default=True)
+        category = models.TransactionCategory.objects.create(name='Fees', category_type=models.DEBIT)
+        Config.objects.create(name='FEES_CATEGORY_ID', value=category.id)
+        user = User.objects.create(username='accountant')
+        user.groups.add(Group.objects.create(name='Accountant'))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        student = User.objects.create(username='student')
+        self.challans = [
+            models.FeeChallan.objects.create(
+                student=student, total=100, outstanding=100, due_date=datetime.date(2019, 4, 10)
+            ) for _ in range(2)
+        ]
+
+    def bulk_pay(self, payments, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(
+            '/api/v1/finance/fees/challans/bulk_pay/', payments, format='json', **headers
+        )
+
+    def get_payments(self, challans, paid=100):
+        return [{
+            'challan_id': challan.id, 'paid': paid, 'late_fee': 0, 'discount': 0,
+            'payment_date': '2019-04-05T10:00:00Z',
+        } for challan in challans]
+
+    def test_missing_challan_rolls_back(self):
+        payments = self.get_payments(self.challans) + [dict(self.get_payments(self.challans)[0], challan_id=0)]
+        response = self.bulk_pay(payments, key='missing')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['success'] for result in response.data], [True, True, False])
+        self.assertFalse(models.FeeChallan.objects.filter(paid__gt=0).exists())
+        self.assertFalse(models.Transaction.objects.exists())
+        self.assertFalse(models.PaymentKey.objects.exists())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 0)
+
+    def test_replay_records_payment_once(self):
+        payments = self.get_payments(self.challans)
+        first = self.bulk_pay(payments, key='replay')
+        second = self.bulk_pay(payments, key='replay')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(models.Transaction.objects.count(), 2)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 200)
+
+    def test_payload_fields(self):
+        fields = {
+            'id', 'student', 'break_down', 'total', 'paid', 'late_fee', 'discount',
+            'due_date', 'paid_at', 'paid_by', 'description', 'received_by',
+        }
+        response = self.bulk_pay(self.get_payments(self.challans[:1]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]['data']), fields)
+        response = self.client.get('/api/v1/finance/fees/challans/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(row) for row in response.data['data']], [fields, fields])
+
+    def test_conflicting_key(self):
+        challan = self.challans[0]
+        response = self.bulk_pay(self.get_payments([challan], paid=40), key='conflict')
+        self.assertEqual(response.status_code, 200)
+        response = self.bulk_pay(self.get_payments([challan], paid=60), key='conflict')
+        self.assertEqual(response.status_code, 409)
+        # Hashed payments match, so pay replays the same payment and conflicts on another challan
+        payment = self.get_payments([challan], paid=40)[0]
+        del payment['challan_id']
+        response = self.client.post(
+            f'/api/v1/finance/fees/challans/{challan.id}/pay/', payment, format='json',
+            HTTP_IDEMPOTENCY_KEY='conflict'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            f'/api/v1/finance/fees/challans/{self.challans[1].id}/pay/', payment, format='json',
+            HTTP_IDEMPOTENCY_KEY='conflict'
+        )
+        self.assertEqual(response.status_code, 409)
+        challan.refresh_from_db()
+        self.assertEqual(challan.paid, 40)
+        self.assertEqual(models.Transaction.objects.count(), 1)
+
+
+class ChallanCreationTestCase(TestCase):
+
+    def setUp(self):
+        user = User.objects.create(username='accountant')
+        user.groups.add(Group.objects.create(name='Accountant'))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.structure = models.FeeStructure.objects.create(
+            name='Monthly', break_down={'Tuition': 100}, total=100
+        )
+        self.students = [User.objects.create(username=f'student{index}') for index in range(3)]
+        self.due_date = datetime.date(2019, 4, 10)
+
+    def create_challans(self):
+        return self.client.post('/api/v1/finance/fees/challans/', {
+            'description': 'April', 'structure_id': self.structure.id, 'target_type': 'individuals',
+            'due_date': self.due_date.isoformat(), 'target_value': [student.id for student in self.students],
+        }, format='json')
+
+    def test_orphaned_challan_skips_nobody(self):
+        models.FeeChallan.objects.create(
+            student=self.students[0], structure=self.structure, total=100, due_date=self.due_date
+        )
+        orphan = User.objects.create(username='deleted')
+        models.FeeChallan.objects.create(
+            student=orphan, structure=self.structure, total=100, due_date=self.due_date
+        )
+        orphan.delete()
+
+        response = self.create_challans()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {'created': 2, 'skipped': 1})
+        self.assertEqual(
+            models.FeeChallan.objects.filter(student__in=self.students, structure=self.structure).count(), 3
+        )
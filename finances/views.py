@@ -1,22 +1,24 @@
-from datetime import date, timedelta, datetime
+from datetime import date, timedelta
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.mixins import CreateModelMixin, ListModelMixin
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from django.db.models import F, Q, Avg, Sum, Max, Min, Count
+from common.exports import submit_export
+from common.pagination import paginate
 from common.permissions import IsAdmin, IsAccountant
+from accounts.services.search import StudentSearchService
 from finances import serializers, models
-from django.core.paginator import Paginator
+from finances.services.balances import StudentBalanceService
+from finances.services.challans import ChallanPaymentService, IdempotencyKeyConflict
+from finances.services.ledger import LedgerService
+from finances.services.reports import FeeReportService
 import json
-from common.models import Config
+from django.db import transaction
 from django.http import HttpResponse
-import os
-import csv
-from django.conf import LazySettings
-
-settings = LazySettings()
 
 
 class TransactionViewSet(CreateModelMixin, GenericViewSet):
@@ -64,14 +66,13 @@ class TransactionViewSet(CreateModelMixin, GenericViewSet):
         else:
             return Response(
                 status=status.HTTP_400_BAD_REQUEST,
-                data=results['errors']
+                data=result['errors']
             )
 
     @staticmethod
     def create_transaction(data, context):
-        default_account = models.Account.objects.filter(is_default=True).first()
         data = data.copy()
-        data['account'] = default_account.id
+        data['account'] = LedgerService.get_default_account_id()
         data['transaction_type'] = context['transaction_type']
         serializer = TransactionViewSet.serializer_class(data=data, context=context)
         if not serializer.is_valid():
@@ -122,46 +123,49 @@ class TransactionSummaryAPIView(APIView):
 
         results = {}
         today = date.today()
-        year = today.year
-        month = today.month
+        year_start = today.replace(month=1, day=1)
+        month_start = today.replace(day=1)
+        # Read from daily rollups, see FinanceRollupService
+        rollups = models.DailyTransactionRollup.objects.filter(
+            date__gte=year_start, date__lt=year_start.replace(year=today.year + 1)
+        )
 
         # 1, 5
-        yearly_aggregates = models.Transaction.objects.filter(
-            date__year=year,
+        yearly_aggregates = rollups.filter(
             transaction_type=self.transaction_type
         ).aggregate(
-            total=Sum('amount'), average=Avg('amount')
+            total=Sum('amount'), count=Sum('transactions')
         )
         results['yearly_total'] = yearly_aggregates['total']
-        results['average_item'] = yearly_aggregates['average']
+        results['average_item'] = yearly_aggregates['total'] / yearly_aggregates['count'] \
+            if yearly_aggregates['count'] else None
 
         # 2, 3, 4, 6
-        category_aggregates = models.TransactionCategory.objects.filter(
-            category_type=self.transaction_type
-        ).annotate(
-            total_transactions=Count('transactions', filter=Q(transactions__date__year=year)),
-            yearly_amount=Sum('transactions__amount', filter=Q(transactions__date__year=year)),
-            monthly_amount=Sum('transactions__amount', filter=Q(transactions__date__month=month, transactions__date__year=year))
-        ).filter(total_transactions__gt=0)
+        category_aggregates = rollups.filter(
+            category__category_type=self.transaction_type
+        ).values('category_id', 'category__name').annotate(
+            total_transactions=Sum('transactions'),
+            yearly_amount=Sum('amount'),
+            monthly_amount=Sum('amount', filter=Q(date__gte=month_start))
+        ).filter(total_transactions__gt=0).order_by('category__name')
 
         results['category_wise_data'] = [{
-            'name': c.name,
-            'item_count': c.total_transactions,
-            'yearly_total': c.yearly_amount if c.yearly_amount else 0,
-            'monthly_total': c.monthly_amount if c.monthly_amount else 0,
+            'name': c['category__name'],
+            'item_count': c['total_transactions'],
+            'yearly_total': c['yearly_amount'] if c['yearly_amount'] else 0,
+            'monthly_total': c['monthly_amount'] if c['monthly_amount'] else 0,
         } for c in category_aggregates]
 
         # 7
-        current_month_items = models.Transaction.objects.filter(
-            transaction_type=self.transaction_type,
-            date__year=year, date__month=month
-        )
+        daily_amounts = rollups.filter(
+            transaction_type=self.transaction_type, date__gte=month_start
+        ).values('date').annotate(amount=Sum('amount')).order_by()
 
         monthly_total = 0
         daily_total = {day: 0 for day in range(1, today.day + 1)}
-        for item in current_month_items:
-            daily_total[item.date.day] += item.amount
-            monthly_total += item.amount
+        for item in daily_amounts:
+            daily_total[item['date'].day] = item['amount']
+            monthly_total += item['amount']
         results['monthly_total'] = monthly_total
         results['daily_total'] = daily_total
         return Response(status=status.HTTP_200_OK, data=results)
@@ -201,78 +205,73 @@ class TransactionDetailsAPIView(APIView):
                 data=filter_serializer.errors
             )
 
-        date_range = (
-            filter_serializer.validated_data['start_date'],
-            filter_serializer.validated_data['end_date'] + timedelta(days=1)
+        queryset = self.get_filtered_queryset(
+            filter_serializer.validated_data, self.transaction_type
+        )
+        # Totals are read from daily rollups, see FinanceRollupService
+        rollups = models.DailyTransactionRollup.objects.filter(
+            category__category_type=self.transaction_type,
+            **self.get_date_range(filter_serializer.validated_data)
         )
-        queryset = models.Transaction.objects.filter(
-            date__range=date_range
-        ).select_related('category')
-        if self.transaction_type:
-            queryset = queryset.filter(transaction_type=self.transaction_type)
         results = {}
-        if 'category_id' in filter_serializer.validated_data and \
-                filter_serializer.validated_data['category_id'] != -1:
-            category_id = filter_serializer.validated_data['category_id']
-            queryset = queryset.filter(category_id=category_id)
-
-        queryset = queryset.order_by('-date')
+        first_page = 'page' not in params and not params.get('cursor', None)
         if 'download' in params and params['download'] == 'true':
-            return self.get_downloadable_link(queryset, self.transaction_type)
-        elif 'page' not in params:  # Send category wise data as well
-            category_aggregates = models.TransactionCategory.objects.filter(
-                category_type=self.transaction_type
-            ).annotate(
-                total_amount=Sum(
-                    'transactions__amount',
-                    filter=Q(transactions__date__range=date_range)
-                )
-            ).filter(total_amount__gt=0)
+            return self.get_downloadable_link(params, self.transaction_type, request.user)
+        elif first_page:  # Send category wise data as well
+            category_aggregates = rollups.values('category_id', 'category__name').annotate(
+                total_amount=Sum('amount')
+            ).filter(total_amount__gt=0).order_by('category__name')
             category_wise_data = [{
-                'id': c.id,
-                'name': c.name,
-                'total_amount': c.total_amount if c.total_amount else 0
+                'id': c['category_id'],
+                'name': c['category__name'],
+                'total_amount': c['total_amount'] if c['total_amount'] else 0
             } for c in category_aggregates]
             results['category_wise_data'] = category_wise_data
 
-        paginator = Paginator(queryset, 20)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-            aggregate_queryset = models.TransactionCategory.objects.filter(
-                category_type=self.transaction_type,
-                transactions__date__range=date_range
-            )
+        if first_page:
+            aggregate_queryset = rollups
             if 'category_id' in filter_serializer.validated_data and \
                     filter_serializer.validated_data['category_id'] != -1:
                 category_id = filter_serializer.validated_data['category_id']
-                aggregate_queryset = aggregate_queryset.filter(id=category_id)
+                aggregate_queryset = aggregate_queryset.filter(category_id=category_id)
 
-            yearly_aggregates = aggregate_queryset.aggregate(
-                total=Sum('transactions__amount')
-            )
+            yearly_aggregates = aggregate_queryset.aggregate(total=Sum('amount'))
             results['sum'] = yearly_aggregates['total']
 
-        serializer = serializers.TransactionSerializer(page, many=True)
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        results.update(paginate(
+            queryset, params, 20, serializers.TransactionSerializer, ordering='-date'
+        ))
         return Response(status=status.HTTP_200_OK, data=results)
 
     @staticmethod
-    def get_downloadable_link(queryset, transaction_type):
-        timestamp = datetime.now().strftime("%f")
-        report_type = 'income' if transaction_type == 1 else 'expenses'
-        file_name = f'{report_type}_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([
-                'Title', 'Category', 'Amount', 'Date',
-            ])
-            for income_record in queryset:
-                writer.writerow(TransactionDetailsAPIView.get_csv_row(income_record))
-        return Response(file_name, status=status.HTTP_200_OK)
+    def get_filtered_queryset(filters, transaction_type):
+        """
+        Returns transactions matching validated data of ItemFilterSerializer
+        """
+        queryset = models.Transaction.objects.filter(
+            **TransactionDetailsAPIView.get_date_range(filters)
+        ).select_related('category')
+        if transaction_type:
+            queryset = queryset.filter(transaction_type=transaction_type)
+        if 'category_id' in filters and filters['category_id'] != -1:
+            queryset = queryset.filter(category_id=filters['category_id'])
+        return queryset.order_by('-date')
+
+    @staticmethod
+    def get_date_range(filters):
+        """
+        Returns lookups of dates from start date to end date, both inclusive.
+        """
+        return {
+            'date__gte': filters['start_date'],
+            'date__lt': filters['end_date'] + timedelta(days=1),
+        }
+
+    @staticmethod
+    def get_downloadable_link(params, transaction_type, user):
+        params = params.dict()
+        params['transaction_type'] = transaction_type
+        return submit_export('finances.exports.get_transactions_export', params, user)
 
     @staticmethod
     def get_csv_row(income_record):
@@ -334,107 +333,154 @@ class ChallanViewSet(CreateModelMixin, ListModelMixin, GenericViewSet):
         data = request.data
         serializer = serializers.CreateChallanSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(status=status.HTTP_202_ACCEPTED)
+        counts = serializer.save()
+        return Response(status=status.HTTP_202_ACCEPTED, data=counts)
 
     def list(self, request):
         params = request.query_params
-        queryset = self.get_queryset().select_related(
-            'student__profile__student_info__section__grade'
-        )
-        queryset = self.apply_filters(queryset, params).order_by('-created_at')
+        queryset = self.get_filtered_queryset(params)
         if 'download' in params and params['download'] == 'true':
-            return self.get_downloadable_link(queryset)
+            return self.get_downloadable_link(params, request.user)
 
-        paginator = Paginator(queryset, 20)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-
-        serializer = serializers.FeeChallanSerializer(page, many=True)
-        return Response(status=status.HTTP_200_OK, data={'data': serializer.data, 'page': page.number, 'count': paginator.count, })
+        results = paginate(queryset, params, 20, serializers.FeeChallanSerializer)
+        return Response(status=status.HTTP_200_OK, data=results)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        if instance.paid + instance.discount > 0:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        
-        instance.is_active = False
-        instance.save()
+        with transaction.atomic():
+            # Checked on the locked row so a payment recorded meanwhile is not deleted
+            instance = models.FeeChallan.objects.select_for_update().filter(
+                id=instance.id, is_active=True
+            ).first()
+            if instance is None:  # Deleted by a concurrent request
+                return Response(status=status.HTTP_404_NOT_FOUND)
+            if instance.paid + instance.discount > 0:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            balance = instance.get_balance()
+            instance.is_active = False
+            instance.save(update_fields=['is_active', 'updated_at'])
+            StudentBalanceService.update_balances(
+                [StudentBalanceService.get_change(instance, balance)]
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     @staticmethod
-    def get_downloadable_link(queryset):
-        timestamp = datetime.now().strftime("%f")
-        file_name = f'fees_{timestamp}.csv'
-        with open(os.path.join(settings.BASE_DIR, f'downloadables/{file_name}'), mode='w') as file:
-            writer = csv.writer(file, delimiter=',')
-            writer.writerow([
-                'Invoice #', 'GR #', 'Name', 'Section', 'Fee (Rs.)', 'Paid (Rs.)', 'Discount (Rs.)', 'Due Date', 'Status',
-            ])
-            for challan in queryset:
-                writer.writerow(ChallanViewSet.get_csv_row(challan))
-        return Response(file_name, status=status.HTTP_200_OK)
+    def get_filtered_queryset(params):
+        queryset = models.FeeChallan.objects.filter(is_active=True)
+        queryset = ChallanViewSet.apply_filters(queryset, params).order_by('-created_at')
+        return serializers.FeeChallanSerializer.get_values(queryset)
 
     @staticmethod
-    def get_csv_row(challan):
-        if challan.paid:
-            if challan.discount:
-                status = 'Paid' if challan.paid + challan.discount >= challan.total else 'Unpaid'
-            else:
-                status = 'Paid' if challan.paid >= challan.total else 'Unpaid'
-        else:
-            status = 'Unpaid'
+    def get_challan_rows(challans):
+        queryset = models.FeeChallan.objects.filter(id__in=[challan.id for challan in challans])
+        rows = {row['id']: row for row in serializers.FeeChallanSerializer.get_values(queryset)}
+        return [rows[challan.id] for challan in challans]
 
+    @staticmethod
+    def get_downloadable_link(params, user):
+        return submit_export('finances.exports.get_challans_export', params.dict(), user)
+
+    @staticmethod
+    def get_csv_row(challan):
         return [
-            challan.id,
-            challan.student.profile.student_info.gr_number,
-            challan.student.profile.fullname,
-            f'{challan.student.profile.student_info.section.grade.name} - {challan.student.profile.student_info.section.name}',
-            f'{challan.total:,}',
-            f'{challan.paid:,}',
-            f'{challan.discount:,}',
-            challan.due_date,
-            status,
+            challan['id'],
+            challan['student__profile__student_info__gr_number'],
+            challan['student__profile__fullname'],
+            f"{challan['student__profile__student_info__section__grade__name']} - {challan['student__profile__student_info__section__name']}",
+            f"{challan['total']:,}",
+            f"{challan['paid']:,}",
+            f"{challan['discount']:,}",
+            challan['due_date'],
+            dict(models.FeeChallan.StatusChoices)[challan['status']],
         ]
 
     @action(detail=True, methods=['post'])
     def pay(self, request, pk=None):
+        """
+        Records payment of a challan along with its income transaction in one database
+        transaction. Retries sending the Idempotency-Key header of the original request
+        return the challan without recording the payment again, a key sent again with
+        another payment is rejected with 409.
+        """
         challan = self.get_object()
         data = request.data
         serializer = serializers.FeeChallanPaymentSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
-        challan.paid = challan.paid + data['paid']
-        challan.late_fee = challan.late_fee + data['late_fee']
-        challan.discount = serializer.validated_data['discount']
-        challan.paid_at = serializer.validated_data['payment_date']
-        challan.save()
-        self.add_to_transactions(challan, data['paid'])
-        serializer = serializers.FeeChallanSerializer(instance=challan)
+        payment = dict(serializer.validated_data, challan_id=challan.id)
+        idempotency_key = self.get_idempotency_key(request)
+        try:
+            challans, _ = ChallanPaymentService.pay_challans(
+                [payment], request.user, idempotency_key
+            )
+        except IdempotencyKeyConflict:
+            return self.get_conflict_response()
+        serializer = serializers.FeeChallanSerializer(instance=self.get_challan_rows(challans)[0])
         return Response(
             status=status.HTTP_200_OK,
             data=serializer.data
         )
 
-    def add_to_transactions(self, challan, amount):
-        fees_category_id = Config.objects.filter(
-            name='FEES_CATEGORY_ID'
-        ).first().value
-        data = {
-            'title': 'Invoice #: {0}'.format(challan.id),
-            'category_id': fees_category_id,
-            'amount': amount,
-        }
-        context = {
-            'user': self.request.user,
-            'transaction_type': models.DEBIT,
-        }
-        results = TransactionViewSet.create_transaction(data, context)
-        # TODO rollback payment incase of failure
+    @staticmethod
+    def get_idempotency_key(request):
+        key = request.META.get('HTTP_IDEMPOTENCY_KEY', None)
+        if key is not None and not 0 < len(key) <= 64:
+            raise ValidationError({'Idempotency-Key': ['Key must be 1 to 64 characters long']})
+        return key
+
+    @staticmethod
+    def get_conflict_response():
+        return Response(status=status.HTTP_409_CONFLICT, data={
+            'message': 'Idempotency key was used for another payment'
+        })
 
-    def apply_filters(self, queryset, params):
+    @action(detail=False, methods=['post'])
+    def bulk_pay(self, request):
+        """
+        Records payments of multiple challans, payments are validated together and
+        either all of them are recorded or none. Returns result of each payment,
+        Idempotency-Key header makes retries safe as in pay.
+        """
+        serializer = serializers.FeeChallanBulkPaymentSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            if not isinstance(serializer.errors, list):
+                return Response(status=status.HTTP_400_BAD_REQUEST, data=serializer.errors)
+            return Response(status=status.HTTP_400_BAD_REQUEST, data=[{
+                'challan_id': item.get('challan_id', None) if isinstance(item, dict) else None,
+                'success': not errors,
+                'errors': errors,
+            } for item, errors in zip(request.data, serializer.errors)])
+
+        payments = serializer.validated_data
+        idempotency_key = self.get_idempotency_key(request)
+        try:
+            challans, _ = ChallanPaymentService.pay_challans(
+                payments, request.user, idempotency_key
+            )
+        except IdempotencyKeyConflict:
+            return self.get_conflict_response()
+        if None in challans:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data=[{
+                'challan_id': payment['challan_id'],
+                'success': challan is not None,
+                'errors': {} if challan is not None else {'challan_id': ['Challan does not exist']},
+            } for payment, challan in zip(payments, challans)])
+        rows = self.get_challan_rows(challans)
+        return Response(status=status.HTTP_200_OK, data=[{
+            'challan_id': payment['challan_id'],
+            'success': True,
+            'data': serializers.FeeChallanSerializer(instance=row).data,
+        } for payment, row in zip(payments, rows)])
+
+    @action(detail=False, methods=['get'])
+    def heads(self, request):
+        """
+        Returns amount billed under each fee head of challans matching the list filters.
+        """
+        queryset = self.apply_filters(models.FeeChallan.objects.filter(is_active=True), request.query_params)
+        return Response(status=status.HTTP_200_OK, data=FeeReportService.get_head_totals(queryset))
+
+    @staticmethod
+    def apply_filters(queryset, params):
         if 'from' in params:
             queryset = queryset.filter(due_date__gte=params['from'])
 
@@ -455,19 +501,13 @@ class ChallanViewSet(CreateModelMixin, ListModelMixin, GenericViewSet):
 
         if 'status' in params and params['status'] != 'all':
             if params['status'] == 'paid':
-                queryset = queryset.filter(
-                    paid__gte=F('total') - F('discount')
-                )
+                queryset = queryset.filter(status=models.FeeChallan.PAID)
             if params['status'] == 'unpaid':
-                queryset = queryset.filter(
-                    Q(total__gt=F('paid') + F('discount')) | Q(paid__isnull=True),
-                )
+                queryset = queryset.filter(status=models.FeeChallan.UNPAID)
 
         if 'search_term' in params and params['search_term'] != '':
-            q = params['search_term']
-            queryset = queryset.filter(
-                Q(student__profile__student_info__gr_number__icontains=q) |
-                Q(student__profile__fullname__icontains=q),
+            queryset = StudentSearchService.search(
+                queryset, params['search_term'], prefix='student__profile__', rank=False
             )
 
         return queryset
@@ -1,4 +1,3 @@
-from django.core.paginator import Paginator
 from django.db.models import Q
 from django.shortcuts import render
 from rest_framework.views import APIView
@@ -6,6 +5,7 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework import status
 
+from common.pagination import paginate
 from common.permissions import IsAdmin
 from notifications import serializers
 from notifications import models
@@ -19,16 +19,7 @@ class NotificationViewSet(ModelViewSet):
     def list(self, request, *args, **kwargs):
         params = request.query_params
         queryset = self.get_filtered_queryset(params)
-        paginator = Paginator(queryset, 10)
-        if 'page' in params:
-            page = paginator.page(int(params['page']))
-        else:
-            page = paginator.page(1)
-        serializer = serializers.NotificationSerializer(page, many=True)
-        results = {}
-        results['data'] = serializer.data
-        results['page'] = page.number
-        results['count'] = paginator.count
+        results = paginate(queryset, params, 10, serializers.NotificationSerializer)
         return Response(status=status.HTTP_200_OK, data=results)
 
     def create(self, request, *args, **kwargs):
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 import datetime
 import os
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -36,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_auth',
     'django.contrib.sites',
@@ -60,6 +63,7 @@ REST_USE_JWT = True
 ACCOUNT_EMAIL_VERIFICATION = 'none'  # No email verification required
 
 CORS_ORIGIN_WHITELIST = os.environ.get('CORS_ORIGIN_WHITELIST', '').split(',')
+CORS_ALLOW_HEADERS = default_headers + ('idempotency-key',)
 
 REST_AUTH_SERIALIZERS = {
     'JWT_SERIALIZER': 'accounts.serializers.JWTUserDetailsSerializer'
@@ -78,6 +82,37 @@ JWT_AUTH = {
     'JWT_EXPIRATION_DELTA': datetime.timedelta(days=30),
 }
 
+# Background jobs
+# JOB_EXECUTOR is one of 'local' (thread pool of JOB_WORKERS threads in each web process),
+# 'celery' (celery workers, see README) or 'inline' (request thread, for development and tests)
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'amqp://localhost')
+JOB_EXECUTOR = os.environ.get('JOB_EXECUTOR', 'local')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+
+# Generated files are evicted when not accessed for ARTIFACT_TTL seconds
+# or when their total size exceeds ARTIFACT_MAX_SIZE bytes
+ARTIFACT_TTL = int(os.environ.get('ARTIFACT_TTL', 60 * 60 * 24))
+ARTIFACT_MAX_SIZE = int(os.environ.get('ARTIFACT_MAX_SIZE', 1024 * 1024 * 1024))
+CELERY_BEAT_SCHEDULE = {
+    'sweep-artifacts': {
+        'task': 'common.tasks.sweep_artifacts_task',
+        'schedule': 60 * 60,
+    },
+}
+
+# Cache shared by workers, CACHE_BACKEND is a Django cache backend, e.g.
+# django_redis.cache.RedisCache with CACHE_LOCATION redis://localhost:6379/0.
+# Local memory is per process, cached values then live until their timeout in other workers
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+}
+
+# Serve student autocomplete from an in-memory directory kept by each worker
+STUDENT_DIRECTORY_ENABLED = os.environ.get('STUDENT_DIRECTORY_ENABLED', 'false') == 'true'
+
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
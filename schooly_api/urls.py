@@ -29,4 +29,5 @@ urlpatterns = [
         view=views.download_csv,
         name='download-csv'
         ),
+    path('api/v1/jobs/<int:pk>/', views.JobAPIView.as_view(), name='job-details'),
 ]